@@ -0,0 +1,52 @@
+"""
+Microbenchmark: per-request overhead of AGUISetup.thread().
+
+Every route, WebSocket connect/disconnect and suggestion call resolves its thread through
+`AGUISetup.thread()`, so the hit path must stay allocation free.
+
+Run: python benchmarks/thread_lookup.py [--max-hit-ns N]
+Exits non-zero if the hit path is slower than --max-hit-ns.
+"""
+import argparse
+import sys
+import timeit
+
+from fasthtml.common import fast_app
+from pydantic_ai import Agent
+from pydantic_ai.models.test import TestModel
+
+from py_agui import AGUIThread, setup_agui
+
+
+def _per_call_ns(stmt, number: int) -> float:
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=100_000)
+    parser.add_argument("--max-hit-ns", type=float, default=None)
+    args = parser.parse_args()
+
+    # An explicit secret keeps fast_app from writing a .sesskey file into the cwd
+    app, _ = fast_app(exts='ws', secret_key="thread-lookup-benchmark")
+    agui = setup_agui(app, Agent(TestModel()))
+    agui.thread("main")
+
+    misses = iter(range(10**9))
+    results = {
+        "hit": _per_call_ns(lambda: agui.thread("main"), args.number),
+        "miss": _per_call_ns(lambda: agui.thread(f"t{next(misses)}"), args.number // 10),
+        "construct AGUIThread": _per_call_ns(
+            lambda: AGUIThread(thread_id="x", state=None, agent=agui.agent), args.number // 10),
+    }
+    for name, ns in results.items():
+        print(f"{name:>22}: {ns:10.1f} ns/call")
+
+    if args.max_hit_ns is not None and results["hit"] > args.max_hit_ns:
+        print(f"thread() hit path regressed: {results['hit']:.1f} ns > {args.max_hit_ns} ns")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Byte-counter benchmark: WebSocket wire size of a typical streamed run.
+
+Renders the frames a run sends over /agui/ws (run start, streamed text, a tool call
+with a state snapshot, run finished), then counts the bytes on the wire uncompressed
+and under permessage-deflate with different settings. Each setting is negotiated the way
+a browser connection is, through AGUIWebSocketProtocol, and the bytes counted are the
+ones the protocol writes to the socket.
+
+Run: python benchmarks/ws_compression.py
+"""
+from typing import List
+
+from ag_ui.core.events import (
+    EventType,
+    RunStartedEvent,
+    StateSnapshotEvent,
+    TextMessageContentEvent,
+    TextMessageEndEvent,
+    TextMessageStartEvent,
+    ToolCallEndEvent,
+    ToolCallStartEvent,
+)
+from fasthtml.common import Div
+from pydantic import BaseModel
+from uvicorn.config import Config
+from uvicorn.server import ServerState
+
+from py_agui import WSCompression
+from py_agui.compression import AGUIWebSocketProtocol
+from py_agui.patches import setup_ft_patches
+from py_agui.streaming import Payload
+
+ANSWER = ("Sure! I've added the three contacts you mentioned and created follow-up tasks "
+          "for each of them. Alice will get the quarterly report, Bob the onboarding "
+          "checklist and Carol the budget review. Let me know if you want to change "
+          "priorities or add due dates. ") * 6
+
+
+class Contact(BaseModel):
+    name: str
+    email: str
+
+    def __ft__(self):
+        return Div(Div(self.name, cls="contact-name"), Div(self.email, cls="contact-email"),
+                   cls="pydantic-ui-card")
+
+
+class AppState(BaseModel):
+    contacts: List[Contact]
+
+    def __ft__(self):
+        return Div(*[c.__ft__() for c in self.contacts], id="agui-state", hx_swap_oob="innerHTML")
+
+
+def run_frames(tokens_per_frame: int) -> List[str]:
+    words = ANSWER.split(" ")
+    state = AppState(contacts=[Contact(name=f"Contact {i}", email=f"contact{i}@example.com")
+                               for i in range(40)])
+    events = [
+        RunStartedEvent(type=EventType.RUN_STARTED, thread_id="main", run_id="run-1"),
+        ToolCallStartEvent(type=EventType.TOOL_CALL_START, tool_call_id="call-1",
+                           tool_call_name="add_contact"),
+        StateSnapshotEvent(type=EventType.STATE_SNAPSHOT, snapshot=state),
+        ToolCallEndEvent(type=EventType.TOOL_CALL_END, tool_call_id="call-1"),
+        TextMessageStartEvent(type=EventType.TEXT_MESSAGE_START, message_id="msg-1",
+                              role="assistant"),
+        *[TextMessageContentEvent(type=EventType.TEXT_MESSAGE_CONTENT, message_id="msg-1",
+                                  delta=" ".join(words[i:i + tokens_per_frame]) + " ")
+          for i in range(0, len(words), tokens_per_frame)],
+        TextMessageEndEvent(type=EventType.TEXT_MESSAGE_END, message_id="msg-1"),
+    ]
+    frames = [Payload.render(e.__ft__()) for e in events]
+    frames.append(Payload.render(
+        Div(Div(ANSWER, cls="chat-message-content marked", id="content-msg-1"),
+            cls="chat-message chat-assistant", id="message-msg-1", hx_swap_oob="outerHTML"),
+        Div(id="chat-status", hx_swap_oob="innerHTML")))
+    return frames
+
+
+# What a browser sends when opening /agui/ws
+HANDSHAKE = (b"GET /agui/ws/main HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+             b"Connection: Upgrade\r\nSec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+             b"Sec-WebSocket-Version: 13\r\n"
+             b"Sec-WebSocket-Extensions: permessage-deflate; client_max_window_bits\r\n\r\n")
+
+
+def wire_bytes(frames: List[str], compression: WSCompression) -> int:
+    protocol = AGUIWebSocketProtocol.with_compression(compression)
+    config = Config(app=None, log_level="warning")
+    conn = protocol(config=config, server_state=ServerState(), app_state={}).conn
+    conn.receive_data(HANDSHAKE)
+    conn.send_response(conn.accept(conn.events_received()[0]))
+    conn.data_to_send()
+    total = 0
+    for text in frames:
+        conn.send_text(text.encode())
+        total += sum(len(chunk) for chunk in conn.data_to_send())
+    return total
+
+
+def main():
+    if AGUIWebSocketProtocol is None:
+        raise SystemExit("This benchmark needs uvicorn with websockets installed")
+    setup_ft_patches()
+    configs = {
+        "uncompressed": WSCompression(enabled=False),
+        "deflate (defaults)": WSCompression(),
+        "deflate, min_size=128": WSCompression(min_size=128),
+        "deflate level 1, 9 bits": WSCompression(level=1, window_bits=9),
+        "deflate, no context takeover": WSCompression(no_context_takeover=True),
+        "no context takeover, min_size=128": WSCompression(no_context_takeover=True,
+                                                           min_size=128),
+    }
+    for label, tokens in (("per-token frames", 1), ("coalesced frames (~12 tokens)", 12)):
+        frames = run_frames(tokens)
+        raw = wire_bytes(frames, configs["uncompressed"])
+        print(f"{label}: {len(frames)} frames")
+        for name, compression in configs.items():
+            n = wire_bytes(frames, compression)
+            print(f"  {name:>34}: {n:8d} bytes  ({100 * (1 - n / raw):5.1f}% saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,8 @@ from fasthtml.common import *
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent, RunContext, ToolReturn
 from pydantic_ai.ui import StateDeps
-from ag_ui.core.events import StateSnapshotEvent, EventType
-from py_agui import setup_agui
+from ag_ui.core.events import StateSnapshotEvent, StateDeltaEvent, EventType
+from py_agui import setup_agui, keyed
 from py_agui.layouts import three_pane_layout
 from typing import List, Dict
 import uuid
@@ -73,13 +73,13 @@ class AppState(BaseModel):
         if self.contacts:
             sections.append(Div(
                 H4("Contacts", style="margin:0 0 0.5rem 0;font-size:0.85rem;color:#3b82f6;"),
-                *[c.__ft__() for c in self.contacts],
+                *[keyed(c, f"/contacts/{i}") for i, c in enumerate(self.contacts)],
                 style="margin-bottom:0.75rem;"
             ))
         if self.todos:
             sections.append(Div(
                 H4("Tasks", style="margin:0 0 0.5rem 0;font-size:0.85rem;color:#f59e0b;"),
-                *[t.__ft__() for t in self.todos],
+                *[keyed(t, f"/todos/{i}") for i, t in enumerate(self.todos)],
                 cls="pydantic-ui-card"
             ))
         if self.summary:
@@ -134,7 +134,9 @@ def complete_task(ctx: RunContext[StateDeps[AppState]], task_index: int) -> Tool
         ctx.deps.state.todos[task_index].done = True
         return ToolReturn(
             return_value=f"Completed task: {ctx.deps.state.todos[task_index].task}",
-            metadata=[StateSnapshotEvent(type=EventType.STATE_SNAPSHOT, snapshot=ctx.deps.state)]
+            metadata=[StateDeltaEvent(type=EventType.STATE_DELTA, delta=[
+                {"op": "replace", "path": f"/todos/{task_index}/done", "value": True}
+            ])]
         )
     return ToolReturn(return_value="Task index out of range")
 
@@ -167,7 +169,7 @@ def list_all(ctx: RunContext[StateDeps[AppState]]) -> str:
 # --- FastHTML App ---
 
 app, rt = fast_app(exts='ws', hdrs=[MarkdownJS()])
-agui = setup_agui(app, agent, AppState(), AppState)
+agui = setup_agui(app, agent, AppState(), AppState, keyed_state=True)
 
 THREAD = "main"
 
@@ -2,7 +2,16 @@
 py-agui: Python Agentic UI - Real-time agentic chat interfaces with FastHTML
 """
 from .core import setup_agui, AGUISetup, AGUIThread
-from .styles import get_chat_styles, get_custom_theme
+from .backplane import Backplane, InProcessBackplane, RedisBackplane, InMemoryRedis
+from .compression import WSCompression
+from .connections import Connection, ConnectionRegistry
+from .history import HistoryPolicy, FullHistory, LastTurns, TokenBudget, RollingSummary
+from .rendering import RenderCache, cached
+from .scripts import sse_ext_script
+from .settings import AGUISettings
+from .state import keyed, apply_patch, JsonPatchError
+from .store import ThreadStore, InMemoryThreadStore, SQLiteThreadStore
+from .styles import get_chat_styles, get_custom_theme, chat_styles_link, custom_theme_link
 from .layouts import (
     chat_with_sidebar,
     simple_chat,
@@ -19,8 +28,32 @@ __all__ = [
     "setup_agui",
     "AGUISetup",
     "AGUIThread",
+    "AGUISettings",
+    "Backplane",
+    "InProcessBackplane",
+    "RedisBackplane",
+    "InMemoryRedis",
+    "WSCompression",
+    "Connection",
+    "ConnectionRegistry",
+    "HistoryPolicy",
+    "FullHistory",
+    "LastTurns",
+    "TokenBudget",
+    "RollingSummary",
+    "keyed",
+    "cached",
+    "RenderCache",
+    "sse_ext_script",
+    "apply_patch",
+    "JsonPatchError",
+    "ThreadStore",
+    "InMemoryThreadStore",
+    "SQLiteThreadStore",
     "get_chat_styles",
     "get_custom_theme",
+    "chat_styles_link",
+    "custom_theme_link",
     "chat_with_sidebar",
     "simple_chat",
     "three_pane_layout",
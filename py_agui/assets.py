@@ -0,0 +1,86 @@
+"""Content-hashed static assets (CSS, JS) served precompressed with long-lived cache headers."""
+import gzip
+import hashlib
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+ASSET_PREFIX = "/agui/assets"
+# The URL changes whenever the content does, so clients may cache forever
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+_assets: Dict[str, "Asset"] = {}
+
+
+@dataclass(frozen=True)
+class Asset:
+    name: str
+    content: bytes
+    media_type: str
+    digest: str
+    # Precompressed variants keyed by content-coding ('br', 'gzip')
+    encoded: Dict[str, bytes] = field(default_factory=dict, compare=False)
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}-{self.digest}"
+
+    @property
+    def url(self) -> str:
+        # No file extension: FastHTML's default static route claims paths ending in .css/.js
+        return f"{ASSET_PREFIX}/{self.key}"
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+
+@lru_cache(maxsize=256)
+def register_asset(name: str, content: str, media_type: str) -> Asset:
+    """Register `content` under a content-hashed URL and return the asset.
+
+    Memoized, so layouts can call this on every render without re-hashing. Gzip (and
+    brotli, if installed) variants are compressed once here rather than per request.
+    """
+    data = content.encode()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    encoded = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded['br'] = brotli.compress(data, quality=11)
+    asset = Asset(name=name, content=data, media_type=media_type, digest=digest, encoded=encoded)
+    return _assets.setdefault(asset.key, asset)
+
+
+def get_asset(key: str) -> Optional[Asset]:
+    return _assets.get(key)
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def asset_response(asset: Asset, request: Request) -> Response:
+    accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+    encoding = next((e for e in ("br", "gzip") if e in accepted and e in asset.encoded), None)
+    headers = {"Cache-Control": CACHE_CONTROL, "ETag": asset.etag(encoding),
+               "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if asset.etag(encoding) in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    if encoding is None:
+        return Response(asset.content, media_type=asset.media_type, headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(asset.encoded[encoding], media_type=asset.media_type, headers=headers)
@@ -0,0 +1,265 @@
+"""Broadcast backplanes: fan rendered frames out to every process serving a thread.
+
+A thread publishes each frame once. The in-process backplane delivers it to the
+connections of the current process. `RedisBackplane` also relays it over Redis pub/sub so
+tabs connected to other workers or pods get it too. It also tells the other processes when
+a thread's persisted data changed, so they reload their cached copy from the shared store:
+
+    from redis.asyncio import Redis
+    agui = setup_agui(app, agent, backplane=RedisBackplane(Redis.from_url("redis://...")))
+"""
+import asyncio
+import logging
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+from .streaming import Payload
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[Payload], None]
+OnChange = Callable[[str], None]
+
+
+class Backplane:
+    """Routes frames published for a thread to the processes with connections to it."""
+
+    # True when frames may be delivered to other processes
+    remote = False
+
+    def subscribe(self, thread_id: str, deliver: Deliver):
+        """Deliver frames for `thread_id` to this process's connections via `deliver`."""
+        raise NotImplementedError
+
+    def unsubscribe(self, thread_id: str):
+        """Stop delivering frames for `thread_id` to this process."""
+        raise NotImplementedError
+
+    async def publish(self, thread_id: str, payload: Payload):
+        raise NotImplementedError
+
+    def publish_change(self, thread_id: str):
+        """Tell other processes that `thread_id`'s persisted data changed."""
+        pass
+
+    def watch_changes(self, on_change: OnChange):
+        """Call `on_change` with the id of each thread another process changed.
+
+        Every setup sharing the backplane registers its own callback once. Listening starts
+        in the event loop, on this call or on the first subscribe or publish made in one.
+        """
+        pass
+
+    async def close(self):
+        pass
+
+
+class InProcessBackplane(Backplane):
+    """Delivers frames to connections in the current process only."""
+
+    def __init__(self):
+        self._local: Dict[str, Deliver] = {}
+
+    def subscribe(self, thread_id: str, deliver: Deliver):
+        self._local[thread_id] = deliver
+
+    def unsubscribe(self, thread_id: str):
+        self._local.pop(thread_id, None)
+
+    async def publish(self, thread_id: str, payload: Payload):
+        deliver = self._local.get(thread_id)
+        if deliver is not None:
+            deliver(payload)
+
+
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class RedisBackplane(InProcessBackplane):
+    """Relays frames between processes over Redis pub/sub, one channel per thread.
+
+    `redis` is a `redis.asyncio.Redis` client, or anything with the same `publish` and
+    `pubsub()` API such as `InMemoryRedis`. Frames are delivered locally right away and
+    published tagged with this process's id, so a process skips its own frames when they
+    come back from Redis, and with their replay cursor. Changes to threads' persisted data
+    are announced on `changes_channel`, which every process listens on.
+    """
+
+    remote = True
+
+    def __init__(self, redis: Any, channel_prefix: str = "agui:thread:",
+                 changes_channel: str = "agui:changes"):
+        super().__init__()
+        self.redis = redis
+        self.channel_prefix = channel_prefix
+        self.changes_channel = changes_channel
+        self.node_id = uuid.uuid4().hex
+        self._pubsub: Any = None
+        self._reader: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+        self._on_change: List[OnChange] = []
+        self._watching = False
+
+    def _channel(self, thread_id: str) -> str:
+        return self.channel_prefix + thread_id
+
+    def _listen(self, channel: str):
+        if self._pubsub is None:
+            self._pubsub = self.redis.pubsub()
+        self._schedule(self._pubsub.subscribe(channel))
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+    def subscribe(self, thread_id: str, deliver: Deliver):
+        super().subscribe(thread_id, deliver)
+        self._listen(self._channel(thread_id))
+        self._watch()
+
+    def unsubscribe(self, thread_id: str):
+        super().unsubscribe(thread_id)
+        if self._pubsub is not None:
+            self._schedule(self._pubsub.unsubscribe(self._channel(thread_id)))
+
+    def _schedule(self, coro):
+        task = asyncio.create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def publish(self, thread_id: str, payload: Payload):
+        await super().publish(thread_id, payload)
+        self._watch()
+        await self._publish(self._channel(thread_id), thread_id,
+                            f"{payload.cursor or ''}\n{payload}")
+
+    async def _publish(self, channel: str, thread_id: str, data: str):
+        try:
+            await self.redis.publish(channel, f"{self.node_id}\n{data}")
+        except Exception:
+            logger.warning("Failed to publish to the backplane for thread %s", thread_id,
+                           exc_info=True)
+
+    def publish_change(self, thread_id: str):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._watch()
+        self._schedule(self._publish(self.changes_channel, thread_id, thread_id))
+
+    def watch_changes(self, on_change: OnChange):
+        if on_change not in self._on_change:
+            self._on_change.append(on_change)
+        self._watch()
+
+    def _watch(self):
+        """Start listening for changes once there is a watcher and an event loop."""
+        if self._watching or not self._on_change:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._watching = True
+        self._listen(self.changes_channel)
+
+    async def _read(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0)
+            except Exception:
+                logger.warning("Backplane read failed", exc_info=True)
+                await asyncio.sleep(1.0)
+                continue
+            if message is None or message.get('type') != 'message':
+                continue
+            node_id, _, payload = _text(message['data']).partition("\n")
+            if node_id == self.node_id:
+                continue
+            channel = _text(message['channel'])
+            if channel == self.changes_channel:
+                for on_change in list(self._on_change):
+                    try:
+                        on_change(payload)
+                    except Exception:
+                        logger.warning("Failed to reload changed thread %s", payload,
+                                       exc_info=True)
+                continue
+            deliver = self._local.get(channel[len(self.channel_prefix):])
+            if deliver is not None:
+                cursor, _, html = payload.partition("\n")
+                deliver(Payload.numbered(html, cursor or None))
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._watching = False
+
+
+class InMemoryRedis:
+    """In-process stand-in for the subset of `redis.asyncio.Redis` pub/sub used by `RedisBackplane`.
+
+    Several backplanes sharing one instance behave like workers sharing a Redis server.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set['InMemoryPubSub']] = {}
+
+    def pubsub(self) -> 'InMemoryPubSub':
+        return InMemoryPubSub(self)
+
+    async def publish(self, channel: str, message: str) -> int:
+        subscribers = self._subscribers.get(channel, set())
+        for pubsub in subscribers:
+            pubsub._receive({'type': 'message', 'channel': channel, 'data': message})
+        return len(subscribers)
+
+
+class InMemoryPubSub:
+    def __init__(self, redis: InMemoryRedis):
+        self._redis = redis
+        self.channels: Set[str] = set()
+        self._messages: Deque[dict] = deque()
+        self._ready = asyncio.Event()
+
+    @property
+    def subscribed(self) -> bool:
+        return bool(self.channels)
+
+    def _receive(self, message: dict):
+        self._messages.append(message)
+        self._ready.set()
+
+    async def subscribe(self, *channels: str):
+        for channel in channels:
+            self.channels.add(channel)
+            self._redis._subscribers.setdefault(channel, set()).add(self)
+            self._receive({'type': 'subscribe', 'channel': channel, 'data': len(self.channels)})
+
+    async def unsubscribe(self, *channels: str):
+        for channel in channels or tuple(self.channels):
+            self.channels.discard(channel)
+            self._redis._subscribers.get(channel, set()).discard(self)
+            self._receive({'type': 'unsubscribe', 'channel': channel, 'data': len(self.channels)})
+
+    async def get_message(self, ignore_subscribe_messages: bool = False,
+                          timeout: Optional[float] = 0.0) -> Optional[dict]:
+        while True:
+            if not self._messages:
+                self._ready.clear()
+                try:
+                    await asyncio.wait_for(self._ready.wait(), timeout)
+                except asyncio.TimeoutError:
+                    return None
+            message = self._messages.popleft()
+            if ignore_subscribe_messages and message['type'] != 'message':
+                continue
+            return message
+
+    async def aclose(self):
+        await self.unsubscribe()
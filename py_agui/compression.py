@@ -0,0 +1,103 @@
+"""Tunable permessage-deflate for the /agui/ws endpoint.
+
+WebSocket compression is negotiated by the ASGI server, not by the app, so the settings
+are applied through a uvicorn protocol class:
+
+    agui = setup_agui(app, agent, ws_compression=WSCompression(level=6, window_bits=12))
+    serve(ws=agui.ws_protocol)
+
+With the uvicorn CLI, expose the protocol from the app module (`ws_protocol =
+agui.ws_protocol`) and pass `--ws main:ws_protocol`.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+from websockets.extensions.permessage_deflate import (
+    PerMessageDeflate,
+    ServerPerMessageDeflateFactory,
+)
+from websockets.frames import Frame, Opcode
+
+try:
+    from uvicorn.protocols.websockets.websockets_sansio_impl import WebSocketsSansIOProtocol
+except ImportError:
+    WebSocketsSansIOProtocol = None
+
+
+@dataclass
+class WSCompression:
+    """permessage-deflate settings for outbound WebSocket frames.
+
+    Frames smaller than `min_size` bytes are sent uncompressed, which RFC 7692 allows per
+    message. This saves compressor CPU on tiny frames, not bytes: with context takeover
+    even single streamed tokens compress well against the earlier frames.
+    """
+    enabled: bool = True
+    level: int = 6
+    window_bits: int = 12
+    mem_level: int = 5
+    min_size: int = 0
+    no_context_takeover: bool = False
+
+    def extension_factory(self) -> ServerPerMessageDeflateFactory:
+        return ThresholdDeflateFactory(self)
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """permessage-deflate that leaves messages below `min_size` uncompressed."""
+
+    def __init__(self, *args, min_size: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+
+    def encode(self, frame: Frame) -> Frame:
+        if (frame.fin and frame.opcode in (Opcode.TEXT, Opcode.BINARY)
+                and len(frame.data) < self.min_size):
+            return frame
+        return super().encode(frame)
+
+
+class ThresholdDeflateFactory(ServerPerMessageDeflateFactory):
+    def __init__(self, settings: WSCompression):
+        super().__init__(
+            server_no_context_takeover=settings.no_context_takeover,
+            server_max_window_bits=settings.window_bits,
+            compress_settings={'level': settings.level, 'memLevel': settings.mem_level},
+        )
+        self.min_size = settings.min_size
+
+    def process_request_params(self, params, accepted_extensions):
+        response_params, ext = super().process_request_params(params, accepted_extensions)
+        return response_params, ThresholdPerMessageDeflate(
+            ext.remote_no_context_takeover,
+            ext.local_no_context_takeover,
+            ext.remote_max_window_bits,
+            ext.local_max_window_bits,
+            ext.compress_settings,
+            min_size=self.min_size,
+        )
+
+
+if WebSocketsSansIOProtocol is not None:
+    class AGUIWebSocketProtocol(WebSocketsSansIOProtocol):
+        """uvicorn WebSocket protocol negotiating permessage-deflate with `compression`.
+
+        The settings live on a subclass made by `with_compression`, one per AGUISetup, so
+        setups with different settings don't overwrite each other. This class itself
+        leaves uvicorn's defaults alone.
+        """
+        compression: Optional[WSCompression] = None
+
+        @classmethod
+        def with_compression(cls, compression: WSCompression) -> type:
+            """A subclass negotiating with `compression`, to pass to uvicorn as `ws=`."""
+            return type(cls.__name__, (cls,), {'compression': compression})
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            if self.compression is None or not self.config.ws_per_message_deflate:
+                return
+            self.conn.available_extensions = (
+                [self.compression.extension_factory()] if self.compression.enabled else [])
+else:
+    AGUIWebSocketProtocol = None
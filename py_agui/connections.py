@@ -0,0 +1,84 @@
+"""Registry of open WebSocket connections, indexed by thread and by browser session.
+
+Connections are registered under the thread id from the WebSocket path, so one browser
+session can have sockets open to any number of threads at once.
+"""
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+# Scope entry holding the id a connection was registered under
+CONNECTION_ID_KEY = "agui.connection_id"
+
+
+@dataclass
+class Connection:
+    """One open socket: a stable `id`, the thread it follows and the session that opened it."""
+    id: str
+    thread_id: str
+    session_id: Optional[str] = None
+    ws: Any = field(default=None, repr=False)
+
+
+class ConnectionRegistry:
+    """Open connections by id, with O(1) lookup of the connections per thread and per session."""
+
+    def __init__(self):
+        self._connections: Dict[str, Connection] = {}
+        self._by_thread: Dict[str, Set[str]] = {}
+        self._by_session: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def __contains__(self, connection_id: str) -> bool:
+        return connection_id in self._connections
+
+    def add(self, thread_id: str, session_id: Optional[str] = None, ws: Any = None) -> Connection:
+        """Register a new connection and return it with a freshly assigned id.
+
+        When `ws` is given, the id is also stored in its ASGI scope for `connection_id`.
+        """
+        conn = Connection(uuid.uuid4().hex, thread_id, session_id, ws)
+        self._connections[conn.id] = conn
+        self._by_thread.setdefault(thread_id, set()).add(conn.id)
+        if session_id is not None:
+            self._by_session.setdefault(session_id, set()).add(conn.id)
+        if ws is not None:
+            ws.scope[CONNECTION_ID_KEY] = conn.id
+        return conn
+
+    def remove(self, connection_id: Optional[str]) -> Optional[Connection]:
+        conn = self._connections.pop(connection_id, None)
+        if conn is None:
+            return None
+        _discard(self._by_thread, conn.thread_id, conn.id)
+        if conn.session_id is not None:
+            _discard(self._by_session, conn.session_id, conn.id)
+        return conn
+
+    def get(self, connection_id: str) -> Optional[Connection]:
+        return self._connections.get(connection_id)
+
+    def for_thread(self, thread_id: str) -> List[Connection]:
+        return [self._connections[i] for i in self._by_thread.get(thread_id, ())]
+
+    def for_session(self, session_id: str) -> List[Connection]:
+        return [self._connections[i] for i in self._by_session.get(session_id, ())]
+
+    def threads(self, session_id: str) -> Set[str]:
+        """Ids of the threads `session_id` currently has connections to."""
+        return {conn.thread_id for conn in self.for_session(session_id)}
+
+
+def connection_id(ws) -> Optional[str]:
+    """The id `ws` was registered under, if any."""
+    return ws.scope.get(CONNECTION_ID_KEY)
+
+
+def _discard(index: Dict[str, Set[str]], key: str, connection_id: str):
+    ids = index.get(key)
+    if ids is not None:
+        ids.discard(connection_id)
+        if not ids:
+            del index[key]
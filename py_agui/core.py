@@ -1,6 +1,7 @@
 """Core AGUI functionality: thread management, WebSocket handling, and streaming."""
-from typing import Dict, List, Optional, Any, TypeVar, Generic, Callable
-from pydantic import BaseModel
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, TypeVar, Generic, Callable, Tuple
+from pydantic import BaseModel, ValidationError
 from pydantic_ai import Agent
 from pydantic_ai.ui.ag_ui import AGUIAdapter
 from pydantic_ai.ui import StateDeps
@@ -17,30 +18,79 @@ from ag_ui.core.events import (
     EventType,
     RunStartedEvent,
     RunFinishedEvent,
+    RunErrorEvent,
     TextMessageStartEvent,
     TextMessageChunkEvent,
     StateSnapshotEvent,
 )
 from fasthtml.common import *
 from fasthtml.core import *
+import copy
 import uuid
+from dataclasses import replace
 import asyncio
+import logging
 from .patches import setup_ft_patches
-from .styles import get_chat_styles
+from .runs import AdmissionController, RunRecord, RunRegistry, RunStatus
+from .store import InMemoryThreadStore, ThreadRecord, ThreadStore
+from .streaming import ConnectionWriter, DeltaCoalescer, Payload, ReplayBuffer, sse_event
+from .backplane import Backplane, InProcessBackplane
+from .connections import ConnectionRegistry, connection_id
+from .events import MEDIA_TYPES, EventFormat, EventStream, encode_event
+from .assets import ASSET_PREFIX, asset_response, get_asset
+from .compression import AGUIWebSocketProtocol
+from .scripts import chat_script_tag
+from .history import FullHistory, HistorySummary
+from .markdown import MarkdownRenderer, content_digest, resolve_renderer
+from .rendering import RenderCache, use_render_cache
+from .settings import AGUISettings, Transport
+from .state import JsonPatchError, KeyedState, apply_patch, diff, render_state
+from .styles import chat_styles_link
 
 T = TypeVar('T', bound=BaseModel)
 
+# Seconds between SSE comment lines keeping idle streams open through proxies
+SSE_KEEPALIVE = 15
+
+# Response header of POST /agui/send carrying the id of the run a message started
+RUN_ID_HEADER = "X-AGUI-Run-Id"
+
+logger = logging.getLogger(__name__)
+
 
 class UI(Generic[T]):
     """Renders chat UI components for a thread."""
 
-    def __init__(self, thread_id: str, autoscroll: bool = True):
+    def __init__(self, thread_id: str, autoscroll: bool = True,
+                 replay: Optional[ReplayBuffer] = None, transport: Transport = 'ws',
+                 message_html: Optional[Callable[[BaseMessage], Optional[Safe]]] = None):
         self.thread_id = thread_id
         self.autoscroll = autoscroll
+        self.replay = replay
+        self.transport = transport
+        # Server-rendered Markdown for a message; None leaves rendering to marked.js
+        self.message_html = message_html
+
+    def _send_attrs(self) -> dict:
+        """Attributes making an element submit its values to the thread over the transport."""
+        if self.transport == 'sse':
+            return {'hx_post': f'/agui/send/{self.thread_id}', 'hx_swap': 'none'}
+        return {'ws_send': True}
+
+    def _stop_button(self):
+        return Button("Stop", type="button", cls="chat-stop-button",
+                      hx_vals='{"action": "stop"}', **self._send_attrs())
+
+    def _run_status(self):
+        return Div("...thinking...", self._stop_button(), id="chat-status", hx_swap_oob="innerHTML")
+
+    def _status(self, text: str = ""):
+        return Div(text, id="chat-status", hx_swap_oob="innerHTML")
 
     def _trigger_run(self, run_id: str):
         return Div(
             "...thinking...",
+            self._stop_button(),
             Div(
                 id=f"run-trigger-{run_id}",
                 hx_get=f'/agui/run/{self.thread_id}/{run_id}',
@@ -51,16 +101,79 @@ class UI(Generic[T]):
             hx_swap_oob="innerHTML"
         )
 
+    def _seq_marker(self, cursor: str, oob: bool = False):
+        """Hidden element carrying the replay cursor of a frame.
+
+        Frames only carry it where the numbering jumps; the chat script counts the others.
+        """
+        attrs = {'hx_swap_oob': 'true'} if oob else {}
+        return Span(id=f"agui-seq-{self.thread_id}", data_seq=cursor, hidden=True, **attrs)
+
+    def _streaming_message(self, message: AssistantMessage):
+        """The reply still being streamed, with the content received so far."""
+        return Div(
+            Div(
+                Span(message.content, id=f"message-content-{message.id}", cls="marked"),
+                Span("", cls="chat-streaming", id=f"streaming-{message.id}"),
+                cls="chat-message-content"
+            ),
+            cls="chat-message chat-assistant",
+            id=f"message-{message.id}"
+        )
+
     def _clear_input(self):
         return self._render_input_form(oob_swap=True)
 
-    def _render_messages(self, messages: List[BaseMessage]):
+    def _render_messages(self, messages: List[BaseMessage], page_size: Optional[int] = None):
+        """Render the message list, limited to the last `page_size` messages if given."""
+        start = max(0, len(messages) - page_size) if page_size else 0
         return Div(
-            *[m.__ft__() if hasattr(m, '__ft__') else self._render_message(m) for m in messages],
+            *self._render_history_page(messages, start, len(messages)),
             id="chat-messages",
             cls="chat-messages"
         )
 
+    def _render_history_page(self, messages: List[BaseMessage], start: int, end: int):
+        """Render `messages[start:end]`, preceded by a lazy loader for anything earlier."""
+        components = [self._message_component(m) for m in messages[start:end]]
+        if start > 0:
+            components.insert(0, self._load_earlier(start))
+        return components
+
+    def _load_earlier(self, before: int):
+        return Div(
+            "Loading earlier messages...",
+            hx_get=f'/agui/messages/{self.thread_id}?before={before}',
+            # `revealed` only watches the window; the list scrolls inside #chat-messages
+            hx_trigger='intersect once root:#chat-messages',
+            hx_swap='outerHTML',
+            cls="chat-history-sentinel"
+        )
+
+    def _append_message(self, message: BaseMessage):
+        """Append a single message to the already rendered `#chat-messages` list."""
+        return Div(
+            self._message_component(message),
+            id="chat-messages",
+            hx_swap_oob="beforeend"
+        )
+
+    def _message_component(self, message: BaseMessage):
+        html = self.message_html(message) if self.message_html is not None else None
+        if html is not None:
+            return self._rendered_message(message, html)
+        return message.__ft__() if hasattr(message, '__ft__') else self._render_message(message)
+
+    def _rendered_message(self, message: BaseMessage, html: Safe, **attrs):
+        """A message whose content was already rendered from Markdown on the server."""
+        message_class = "chat-user" if message.role == "user" else "chat-assistant"
+        attrs.setdefault('id', message.id)
+        return Div(
+            Div(html, cls="chat-message-content"),
+            cls=f"chat-message {message_class}",
+            **attrs
+        )
+
     def _render_message(self, message: BaseMessage):
         message_class = "chat-user" if message.role == "user" else "chat-assistant"
         return Div(
@@ -70,7 +183,7 @@ class UI(Generic[T]):
         )
 
     def _render_input_form(self, oob_swap=False):
-        form_attrs = {'id': 'chat-form', 'ws_send': True}
+        form_attrs = {'id': 'chat-form', **self._send_attrs()}
         container_attrs = {'cls': 'chat-input', 'id': 'chat-input-container'}
         if oob_swap:
             container_attrs['hx_swap_oob'] = 'outerHTML'
@@ -106,8 +219,8 @@ class UI(Generic[T]):
 
     def chat(self, **kwargs):
         components = [
-            get_chat_styles(),
-            MarkdownJS(),
+            chat_styles_link(),
+            *([MarkdownJS()] if self.message_html is None else []),
             Div(
                 id="chat-messages",
                 cls="chat-messages",
@@ -116,77 +229,379 @@ class UI(Generic[T]):
                 hx_swap='outerHTML'
             ),
             self._render_input_form(),
-            Script("""
-                function autoResize(textarea) {
-                    textarea.style.height = 'auto';
-                    const maxHeight = 10 * 16;
-                    const newHeight = Math.min(textarea.scrollHeight, maxHeight);
-                    textarea.style.height = newHeight + 'px';
-                    textarea.style.overflowY = textarea.scrollHeight > maxHeight ? 'auto' : 'hidden';
-                }
-                function handleKeyDown(textarea, event) {
-                    autoResize(textarea);
-                    if (event.key === 'Enter' && !event.shiftKey) {
-                        event.preventDefault();
-                        const form = textarea.closest('form');
-                        if (form && textarea.value.trim()) form.requestSubmit();
-                    }
-                }
-                function renderMarkdown(elementId) {
-                    setTimeout(() => {
-                        const el = document.getElementById(elementId);
-                        if (el && window.marked && el.classList.contains('marked')) {
-                            el.innerHTML = marked.parse(el.textContent || '');
-                        }
-                    }, 10);
-                }
-            """)
+            chat_script_tag(),
         ]
+        if self.replay is not None:
+            components.append(self._seq_marker(self.replay.cursor))
+            kwargs.setdefault('data_agui_thread', self.thread_id)
 
         if self.autoscroll:
-            components.append(Script("""
-                (function() {
-                    const observer = new MutationObserver(() => {
-                        const msgs = document.getElementById('chat-messages');
-                        if (msgs) msgs.scrollTop = msgs.scrollHeight;
-                    });
-                    const target = document.getElementById('chat-messages');
-                    if (target) observer.observe(target, {childList: true, subtree: true});
-                })();
-            """))
-
+            kwargs.setdefault('data_autoscroll', True)
+        if self.transport == 'sse':
+            # Frames are all out-of-band swaps; anything else lands in the hidden sink
+            components.append(Div(sse_swap="message", hx_swap="innerHTML", style="display: none;"))
+            connect = {'hx_ext': 'sse', 'sse_connect': f'/agui/sse/{self.thread_id}'}
+        else:
+            connect = {'hx_ext': 'ws', 'ws_connect': f'/agui/ws/{self.thread_id}'}
         return Div(
             *components,
-            hx_ext='ws',
-            ws_connect=f'/agui/ws/{self.thread_id}',
             cls="chat-container",
+            **connect,
             **kwargs
         )
 
 
+# Rough per-object overheads used to estimate the memory held by a thread
+_MESSAGE_OVERHEAD = 256
+_STEP_SIZE = 128
+
+
+def _approx_size(message: BaseMessage) -> int:
+    content = message.content
+    return _MESSAGE_OVERHEAD + len(content if isinstance(content, str) else str(content or ''))
+
+
+def _dump_state(state: Any) -> Any:
+    return state.model_dump(mode='json') if isinstance(state, BaseModel) else copy.deepcopy(state)
+
+
+def _copy_state(state: Any) -> Any:
+    return state.model_copy(deep=True) if isinstance(state, BaseModel) else copy.deepcopy(state)
+
+
+def _load_state(current: Any, value: Any) -> Any:
+    """Validate `value` into the model type of `current` when it isn't one already."""
+    if isinstance(current, BaseModel) and not isinstance(value, BaseModel):
+        return type(current).model_validate(value)
+    return value
+
+
+# Session entry identifying a browser session for per-user run limits
+SESSION_ID_KEY = "agui_session_id"
+
+
+def _session_user(session) -> Optional[str]:
+    return session.get(SESSION_ID_KEY)
+
+
 class AGUIThread(Generic[T]):
     """Represents a single AGUI thread/conversation."""
 
-    def __init__(self, thread_id: str, state: T, agent: Agent):
+    def __init__(self, thread_id: str, state: T, agent: Agent,
+                 settings: Optional[AGUISettings] = None, *,
+                 store: Optional[ThreadStore] = None,
+                 backplane: Optional[Backplane] = None,
+                 render_cache: Optional[RenderCache] = None,
+                 admission: Optional[AdmissionController] = None,
+                 markdown: Optional[MarkdownRenderer] = None):
+        settings = settings if settings is not None else AGUISettings()
+        self.settings = settings
         self.thread_id = thread_id
         self._state = state
-        self._runs = {}
+        # True while `_state` is the initial state shared with other threads; it is only
+        # replaced, never mutated, until `state` takes a private copy
+        self._state_shared = False
+        # JSON form of `_state`, kept in sync so deltas and diffs don't see in-place edits
+        self._state_doc: Any = None
+        # True once `state` was handed out for editing in place and not yet saved
+        self._state_dirty = False
+        self._keyed = KeyedState() if settings.keyed_state else None
+        self._render_cache = render_cache
+        self._runs = RunRegistry(pending_ttl=settings.run_ttl, history=settings.run_history)
         self._agent = agent
         self._messages: List[BaseMessage] = []
-        self._connections = {}
+        self._connections: Dict[str, ConnectionWriter] = {}
         self._thinking_steps: List[dict] = []
-        self.ui = UI[T](self.thread_id, autoscroll=True)
+        # Recent frames, so a client reconnecting after a drop gets only what it missed
+        self._replay = ReplayBuffer(settings.replay_buffer) if settings.replay_buffer else None
+        self._markdown = markdown
+        # Rendered Markdown by message id: (content digest, HTML), persisted with the thread
+        self._rendered: Dict[str, Tuple[str, str]] = {}
+        self.ui = UI(self.thread_id, autoscroll=True, replay=self._replay,
+                     transport=settings.transport,
+                     message_html=self._message_html if markdown is not None else None)
         self._suggestions: List[str] = []
+        self._store = store if store is not None else InMemoryThreadStore()
+        self._approx_bytes = 0
+        # Called with every change to `_approx_bytes`, to keep a running total across threads
+        self._on_grow: Optional[Callable[[int], None]] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._history_policy = (settings.history_policy if settings.history_policy is not None
+                                else FullHistory())
+        self._history_summary: Optional[HistorySummary] = None
+        # One run streams at a time; later runs wait on the lock in submission order
+        self._run_lock = asyncio.Lock()
+        # The run holding `_run_lock` and the task admitting and streaming it
+        self._active: Optional[tuple[RunRecord, asyncio.Task]] = None
+        self._admission = admission
+        self._backplane = backplane if backplane is not None else InProcessBackplane()
+        # The reply `_stream_run` is streaming, until it is stored as a message
+        self._streaming: Optional[AssistantMessage] = None
+        # Consumers of the raw AG-UI events of this thread's runs
+        self._event_streams: set[EventStream] = set()
+        # Set when another process changed the persisted thread during a run here
+        self._stale = False
+
+    def _share_state(self, doc: Any):
+        """Mark `_state` as the initial state shared with other threads, with its JSON form."""
+        self._state_shared = True
+        self._state_doc = doc
+
+    @property
+    def state(self) -> T:
+        """This thread's state, safe to modify in place.
+
+        Threads start out sharing the initial state; the first access takes a private copy.
+        In-place edits are saved to the store when the thread's current run ends, before the
+        thread is evicted, or on `save_state()`. Assigning a new state saves it right away.
+        """
+        if self._state_shared:
+            self._state = _copy_state(self._state)
+            self._state_shared = False
+        # The caller may modify the state, so the cached JSON form can't be trusted
+        self._state_doc = None
+        self._state_dirty = True
+        return self._state
+
+    @state.setter
+    def state(self, state: T):
+        self._set_state(state)
+        self._backplane.publish_change(self.thread_id)
+
+    def save_state(self):
+        """Save in-place edits made through `state` to the store."""
+        if self._state_dirty:
+            self._set_state(self._state)
+            self._backplane.publish_change(self.thread_id)
+
+    @property
+    def history_summary(self) -> Optional[HistorySummary]:
+        """Rolling summary of earlier messages kept by `RollingSummary`, saved with the thread."""
+        return self._history_summary
+
+    @history_summary.setter
+    def history_summary(self, summary: HistorySummary):
+        self._history_summary = summary
+        self._store.save_summary(self.thread_id, summary.text, summary.upto)
+
+    @property
+    def is_idle(self) -> bool:
+        """True when no connection or event stream is open and no run is pending or streaming."""
+        return not self._connections and not self._event_streams and not self._runs.active
+
+    def _hydrate(self, record: ThreadRecord):
+        """Restore messages, state and thinking steps from a persisted record."""
+        self._messages = record.messages
+        self._thinking_steps = record.thinking_steps
+        self._rendered = record.rendered
+        self._history_summary = HistorySummary(*record.summary) if record.summary else None
+        self._grow(sum(_approx_size(m) for m in self._messages)
+                   + _STEP_SIZE * len(self._thinking_steps)
+                   + sum(len(html) for _, html in self._rendered.values())
+                   - self._approx_bytes)
+        if record.state is not None:
+            state = record.state
+            if isinstance(self._state, BaseModel) and not isinstance(state, BaseModel):
+                state = type(self._state).model_validate(state)
+            self._state = state
+            self._state_shared = False
+            self._state_doc = None
+            self._state_dirty = False
+
+    def _grow(self, size: int):
+        """Count `size` more bytes, or fewer when negative, towards this thread's memory."""
+        self._approx_bytes += size
+        if self._on_grow is not None:
+            self._on_grow(size)
+
+    def _reload(self):
+        """Replace the cached messages and state with what the store holds now."""
+        self._stale = False
+        record = self._store.load(self.thread_id)
+        if record is not None:
+            self._hydrate(record)
+
+    def _message_html(self, message: BaseMessage) -> Optional[Safe]:
+        """`message` rendered from Markdown, rendering it only if its content changed."""
+        content = message.content
+        if self._markdown is None or not isinstance(content, str):
+            return None
+        digest = content_digest(content)
+        entry = self._rendered.get(message.id)
+        if entry is None or entry[0] != digest:
+            previous = len(entry[1]) if entry is not None else 0
+            entry = self._rendered[message.id] = (digest, self._markdown(content))
+            self._grow(len(entry[1]) - previous)
+            self._store.save_rendered(self.thread_id, message.id, *entry)
+        return Safe(entry[1])
+
+    def _add_message(self, message: BaseMessage):
+        self._messages.append(message)
+        self._grow(_approx_size(message))
+        self._store.append_message(self.thread_id, message)
+
+    def _set_state(self, state: T, doc: Any = None):
+        self._state = state
+        self._state_shared = False
+        self._state_doc = doc
+        self._state_dirty = False
+        self._store.save_state(self.thread_id, state)
+
+    def _state_json(self) -> Any:
+        if self._state_doc is None:
+            self._state_doc = _dump_state(self._state)
+        return self._state_doc
+
+    def render_state(self):
+        """The full state panel, recording its keyed elements when keyed state is on."""
+        with use_render_cache(self._render_cache):
+            if self._keyed is not None:
+                return self._keyed.render(self._state)
+            return render_state(self._state)
+
+    async def _apply_state_event(self, event: BaseEvent):
+        """Apply a STATE_SNAPSHOT or STATE_DELTA and update the state panel.
+
+        With keyed state only the keyed elements covering the change are re-rendered,
+        otherwise (or when a change is not covered) the whole panel is.
+        """
+        old = self._state_json()
+        delta = event.type == EventType.STATE_DELTA
+        try:
+            if delta:
+                new = apply_patch(old, event.delta)
+                state = _load_state(self._state, new)
+            else:
+                state = _load_state(self._state, event.snapshot)
+                new = _dump_state(state)
+        except (JsonPatchError, ValidationError):
+            # A patch that doesn't apply, or a result that doesn't fit the state model
+            logger.warning("Ignoring invalid state %s in thread %s",
+                           "delta" if delta else "snapshot", self.thread_id, exc_info=True)
+            return
+        self._set_state(state, new)
+
+        elements = None
+        if self._keyed is not None:
+            with use_render_cache(self._render_cache):
+                elements = self._keyed.render_patch(state, diff(old, new))
+        if elements is None:
+            await self.send(self.render_state())
+        elif elements:
+            await self.send(Payload.render(*elements))
 
-    def subscribe(self, connection_id, send):
-        self._connections[connection_id] = send
+    def _add_thinking_step(self, step: dict):
+        self._thinking_steps.append(step)
+        self._grow(_STEP_SIZE)
+        self._store.append_thinking_step(self.thread_id, step)
+
+    def subscribe(self, connection_id, send, close=None, resume: Optional[str] = None):
+        """Start sending this thread's frames to a connection.
+
+        `resume` is the replay cursor of the last frame the client received before it
+        reconnected. The frames it missed are queued first, or a snapshot of the chat when
+        they are no longer buffered.
+        """
+        self.unsubscribe(connection_id)
+        if not self._connections:
+            self._backplane.subscribe(self.thread_id, self._deliver)
+        marker = self._cursor_marker if self._replay is not None else None
+        writer = ConnectionWriter(send, close, max_queue=self.settings.max_queue,
+                                  policy=self.settings.overflow_policy, marker=marker)
+        if resume is not None and self._replay is not None:
+            missed = self._replay.since(resume)
+            for payload in missed if missed is not None else [self._snapshot()]:
+                writer.put(payload)
+        self._connections[connection_id] = writer
 
     def unsubscribe(self, connection_id: str):
-        self._connections.pop(connection_id, None)
+        writer = self._connections.pop(connection_id, None)
+        if writer is not None:
+            writer.stop()
+            if not self._connections:
+                self._backplane.unsubscribe(self.thread_id)
+                self._release_replay()
+
+    def _cursor_marker(self, cursor: str) -> str:
+        return to_xml(self.ui._seq_marker(cursor, oob=True), indent=False)
+
+    def _release_replay(self):
+        """Free the replay buffer once the thread is idle: nobody is left to resume from it."""
+        if self._replay is not None and self.is_idle:
+            self._grow(-self._replay.clear())
+
+    async def send(self, element: FT | Payload):
+        """Publish `element` to every connection to this thread, in any process.
 
-    async def send(self, element: FT):
-        for connection_id, send in self._connections.items():
-            await send(element)
+        The element is rendered to HTML once and the same `Payload` is written to every
+        connection without waiting for delivery. With replay enabled the frame is also
+        numbered and kept in the replay buffer, also while clients are briefly disconnected
+        during a run. An idle thread with no connections renders nothing.
+        """
+        if not self._connections and not self._backplane.remote and (
+                self._replay is None or self.is_idle):
+            return
+        payload = element if isinstance(element, Payload) else Payload.render(element)
+        if self._replay is not None:
+            payload = Payload.numbered(payload, self._replay.next_cursor())
+            self._grow(self._replay.append(payload))
+        await self._backplane.publish(self.thread_id, payload)
+
+    def _snapshot(self) -> Payload:
+        """One frame bringing a client that missed too much up to date."""
+        messages = self.ui._render_messages(self._messages, self.settings.history_page_size)
+        if self._streaming is not None:
+            messages(self.ui._streaming_message(self._streaming))
+        messages(*map(self.ui._message_component, self._pending_messages()))
+        messages.attrs['hx-swap-oob'] = 'outerHTML'
+        status = self.ui._run_status() if self._runs.running is not None else self.ui._status()
+        elements = [messages, status]
+        if self._state is not None:
+            elements.append(self.render_state())
+        # The connection's writer adds the cursor marker to its first frame
+        return Payload.numbered(Payload.render(*elements), self._replay.cursor)
+
+    def _deliver(self, payload: Payload):
+        """Queue `payload` on this process's connections."""
+        for connection_id, writer in list(self._connections.items()):
+            if not writer.put(payload):
+                self.unsubscribe(connection_id)
+
+    def open_event_stream(self, run_id: Optional[str] = None) -> EventStream:
+        """Start receiving the raw AG-UI events of this thread's runs, or only of `run_id`.
+
+        A stream following `run_id` first gets the events the run already emitted, so it
+        can be opened after the message was sent, or even shortly after the run ended.
+        Close the stream with `close_event_stream` when done with it.
+        """
+        self._runs.expire()
+        record = self._runs.get(run_id) if run_id is not None else None
+        replay = record.events if record is not None and record.events else []
+        stream = EventStream(run_id, max_queue=self.settings.max_queue + len(replay))
+        for event in replay:
+            stream.put(event, run_id)
+        if record is not None and record.done:
+            stream.close()
+        else:
+            self._event_streams.add(stream)
+        return stream
+
+    def close_event_stream(self, stream: EventStream):
+        stream.close()
+        self._event_streams.discard(stream)
+
+    def _tap_event(self, event: BaseEvent, run_id: str):
+        record = self._runs.get(run_id)
+        if record is not None and record.events is not None:
+            record.events.append(event)
+        for stream in list(self._event_streams):
+            if not stream.put(event, run_id):
+                self._event_streams.discard(stream)
+
+    def connection_stats(self) -> Dict[str, Dict[str, int]]:
+        """Outbound queue depth and counters for each subscribed connection."""
+        return {connection_id: writer.stats()
+                for connection_id, writer in self._connections.items()}
 
     async def set_suggestions(self, suggestions: List[str]):
         self._suggestions = suggestions[:4]
@@ -201,12 +616,16 @@ class AGUIThread(Generic[T]):
             )
         else:
             el = Div(id="suggestion-buttons", hx_swap_oob="outerHTML")
-        await self.send(el)
+        await self.send(Payload.render(el))
 
     def get_suggestions(self) -> List[str]:
         return self._suggestions.copy()
 
-    async def _handle_message(self, msg: str, session):
+    async def _handle_message(self, msg: str, session, user: Optional[str] = None) -> Optional[str]:
+        """Submit `msg` as a new run. Returns its run id, or None if too many runs are queued."""
+        if self._runs.active > self.settings.max_queued_runs:
+            await self.send(self.ui._status("Please wait for the current response to finish."))
+            return None
         run_id = str(uuid.uuid4())
         message = UserMessage(
             id=str(uuid.uuid4()),
@@ -214,32 +633,151 @@ class AGUIThread(Generic[T]):
             content=msg,
             name=session.get("username", "User")
         )
-        self._messages.append(message)
+        # The message joins the transcript when its run starts, after any reply still streaming
+        self._runs.add(run_id, message, user=user)
 
-        run_input = RunAgentInput(
+        await self.send(Payload.render(
+            self.ui._append_message(message),
+            (self.ui._run_status() if self.settings.server_side_runs
+             else self.ui._trigger_run(run_id)),
+            Div(
+                Div(Span(cls="loading"), id="run-start"),
+                id="agui-messages", hx_swap_oob="beforeend"
+            ),
+            self.ui._clear_input(),
+        ))
+        if self.settings.server_side_runs:
+            self._start_run(run_id)
+        return run_id
+
+    def _begin_run(self, record: RunRecord):
+        """Mark `record` running: add its message and build its input from the thread as it is now.
+
+        Runs queued behind another thus see that run's reply and state changes.
+        """
+        if record.message is not None:
+            self._add_message(record.message)
+        record.input = RunAgentInput(
             thread_id=self.thread_id,
-            run_id=run_id,
+            run_id=record.run_id,
             messages=self._messages,
-            state=self._state,
+            # Non-model states are handed to tools as-is, so give the run its own copy
+            state=(self._state_json() if isinstance(self._state, BaseModel)
+                   else copy.deepcopy(self._state_json())),
             tools=[],
             forwarded_props=[],
             context=[],
         )
-        self._runs[run_id] = run_input
+        self._runs.start(record)
 
-        await self.send(self.ui._render_messages(self._messages))
-        await self.send(self.ui._trigger_run(run_id))
-        await self.send(Div(
-            Div(Span(cls="loading"), id="run-start"),
-            id="agui-messages", hx_swap_oob="beforeend"
-        ))
-        await self.send(self.ui._clear_input())
+    def _pending_messages(self) -> List[BaseMessage]:
+        """Messages of runs that haven't started yet, shown after the transcript."""
+        return [r.message for r in self._runs.waiting() if r.message is not None]
+
+    def _drop_message(self, record: RunRecord):
+        """Remove the message of a run dropped before it started from the chat."""
+        if record.message is None:
+            return None
+        return Div(id=record.message.id, hx_swap_oob="delete")
+
+    def _start_run(self, run_id: str):
+        """Run `run_id` as a background task instead of waiting for the client to request it."""
+        task = asyncio.create_task(self._handle_run(run_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._run_task_done)
+
+    def _run_task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Agent run failed in thread %s", self.thread_id, exc_info=task.exception())
 
     async def _handle_run(self, run_id: str):
-        if run_id not in self._runs:
+        record = self._runs.claim(run_id)
+        if record is None:
             return Div("Run not found")
+        try:
+            return await self._run_claimed(record)
+        finally:
+            self._release_replay()
+
+    async def _run_claimed(self, record: RunRecord):
+        async with self._run_lock:
+            if record.done:
+                # Cancelled while waiting for the previous run
+                return Div()
+            # Admit and stream in a child task so `cancel_run` can stop it without
+            # cancelling the request or task that is waiting on it
+            task = asyncio.create_task(self._admit_and_stream(record))
+            self._active = (record, task)
+            try:
+                response = await task
+            except asyncio.CancelledError:
+                self._runs.finish(record, RunStatus.CANCELLED)
+                if asyncio.current_task().cancelling():
+                    raise
+                return Div()
+            except BaseException as e:
+                self._runs.finish(record, RunStatus.ERROR, error=repr(e))
+                raise
+            finally:
+                self._active = None
+                self.save_state()
+                self._backplane.publish_change(self.thread_id)
+                if self._stale:
+                    self._reload()
+        record.message_id = response.id
+        self._runs.finish(record)
+        return Div()
 
-        run_input = self._runs[run_id]
+    async def cancel_run(self, run_id: Optional[str] = None) -> bool:
+        """Cancel `run_id`, or the running run if not given.
+
+        Returns False if there was nothing to cancel.
+
+        A running run's model stream is cancelled; the partial reply is kept and the run
+        ends with a RunErrorEvent. A queued or pending run is dropped before it starts.
+        """
+        active, task = self._active or (None, None)
+        record = self._runs.get(run_id) if run_id is not None else active
+        if record is None or record.done:
+            return False
+        if record is active:
+            if task.done():
+                return False
+            task.cancel()
+        else:
+            dropped = self._drop_message(record)
+            self._runs.finish(record, RunStatus.CANCELLED)
+            if dropped is not None:
+                await self.send(dropped)
+        return True
+
+    async def _admit_and_stream(self, record: RunRecord):
+        if self._admission is None:
+            self._begin_run(record)
+            return await self._stream_run(record.input)
+
+        async def on_wait(position: int):
+            await self.send(Div(f"Waiting for a free slot (position {position})...",
+                                self.ui._stop_button(), id="chat-status", hx_swap_oob="innerHTML"))
+
+        admitted = False
+        try:
+            async with self._admission.slot(record.user or self.thread_id, on_wait):
+                admitted = True
+                await self.send(self.ui._run_status())
+                self._begin_run(record)
+                return await self._stream_run(record.input)
+        except asyncio.CancelledError:
+            if not admitted:
+                dropped = self._drop_message(record)
+                await self.send(Payload.render(self.ui._status(), *([dropped] if dropped else [])))
+            raise
+
+    async def _stream_run(self, run_input: RunAgentInput):
+        # The full transcript stays on the thread; the agent only sees the policy's window
+        window = await self._history_policy.select(self, run_input.messages)
+        run_input = run_input.model_copy(update={'messages': window.messages})
         adapter = AGUIAdapter(self._agent, run_input=run_input)
         response = AssistantMessage(
             id=str(uuid.uuid4()),
@@ -248,51 +786,91 @@ class AGUIThread(Generic[T]):
             name=self._agent.name or "Assistant"
         )
 
+        self._state_json()
         deps = StateDeps[T](state=self._state)
         step_count = 0
+        coalescer = DeltaCoalescer(self._send_event, self.settings.flush_interval_ms,
+                                   self.settings.flush_max_bytes)
+
+        extra = {}
+        if window.summary:
+            extra['instructions'] = f"Summary of the earlier conversation:\n{window.summary}"
+        started = False
+        try:
+            async for event in adapter.run_stream(deps=deps, **extra):
+                self._tap_event(event, run_input.run_id)
+                await coalescer.push(event)
 
-        async for event in adapter.run_stream(
-            message_history=self._messages or [],
-            deps=deps
-        ):
-            if hasattr(event, '__ft__'):
-                await self.send(event.__ft__())
-
-            if event.type == EventType.TEXT_MESSAGE_START:
-                response.id = event.message_id
-            elif event.type == EventType.TEXT_MESSAGE_CONTENT:
-                response.content += event.delta
-            elif event.type == EventType.RUN_FINISHED:
-                self._messages.append(response)
-                content_id = f"content-{response.id}"
-                await self.send(Div(
+                if event.type == EventType.TEXT_MESSAGE_START:
+                    response.id = event.message_id
+                    started = True
+                    self._streaming = response
+                elif event.type == EventType.TEXT_MESSAGE_CONTENT:
+                    response.content += event.delta
+                elif event.type == EventType.RUN_FINISHED:
+                    step_count += 1
+                    await self._finish_response(response, step_count)
+                elif event.type == EventType.TOOL_CALL_START:
+                    step_count += 1
+                    self._add_thinking_step({
+                        'type': 'tool_call',
+                        'name': event.tool_call_name,
+                        'id': event.tool_call_id
+                    })
+                elif event.type == EventType.STEP_STARTED:
+                    step_count += 1
+                    self._add_thinking_step({
+                        'type': 'step',
+                        'name': event.step_name
+                    })
+        except asyncio.CancelledError:
+            # Stopped: close the run in the UI with what was streamed so far
+            await coalescer.flush()
+            stopped = RunErrorEvent(type=EventType.RUN_ERROR, message="Stopped", code="cancelled")
+            self._tap_event(stopped, run_input.run_id)
+            await self._send_event(stopped)
+            if started:
+                await self._finish_response(response, step_count + 1)
+            else:
+                await self.send(self.ui._status())
+            raise
+        finally:
+            self._streaming = None
+
+        await coalescer.flush()
+        return response
+
+    async def _finish_response(self, response: AssistantMessage, step_count: int):
+        """Store the reply and swap its streamed element for the final, markdown-rendered one."""
+        self._add_message(response)
+        self._streaming = None
+        html = self._message_html(response)
+        if html is not None:
+            await self.send(Payload.render(
+                self.ui._rendered_message(response, html, id=f"message-{response.id}",
+                                          hx_swap_oob="outerHTML"),
+                self.ui._status(),
+            ))
+        else:
+            content_id = f"content-{response.id}"
+            await self.send(Payload.render(
+                Div(
                     Div(response.content, cls="chat-message-content marked", id=content_id),
                     cls="chat-message chat-assistant",
                     id=f"message-{response.id}",
                     hx_swap_oob="outerHTML"
-                ))
-                await self.send(Script(f"renderMarkdown('{content_id}');"))
-                await self.send(Div(id="chat-status", hx_swap_oob="innerHTML"))
-                # Update thinking badge count
-                step_count += 1
-                await self.send(Script(f"updateThinkingBadge({len(self._thinking_steps) + step_count});"))
-            elif event.type == EventType.STATE_SNAPSHOT:
-                self._state = event.snapshot
-            elif event.type == EventType.TOOL_CALL_START:
-                step_count += 1
-                self._thinking_steps.append({
-                    'type': 'tool_call',
-                    'name': event.tool_call_name,
-                    'id': event.tool_call_id
-                })
-            elif event.type == EventType.STEP_STARTED:
-                step_count += 1
-                self._thinking_steps.append({
-                    'type': 'step',
-                    'name': event.step_name
-                })
+                ),
+                self.ui._status(),
+            ))
+            await self.send(Script(f"renderMarkdown('{content_id}');"))
+        # Update thinking badge count
+        await self.send(Script(f"updateThinkingBadge({len(self._thinking_steps) + step_count});"))
 
-        return Div()
+    async def _send_event(self, event: BaseEvent):
+        if event.type in (EventType.STATE_SNAPSHOT, EventType.STATE_DELTA):
+            await self._apply_state_event(event)
+        elif hasattr(event, '__ft__'):
+            await self.send(event.__ft__())
 
 
 class AGUISetup(Generic[T]):
@@ -304,51 +882,280 @@ class AGUISetup(Generic[T]):
                  state: T,
                  tools: Optional[List[Tool]] = [],
                  forwarded_props: Any = {},
-                 context: List[Context] = []):
+                 context: List[Context] = [],
+                 settings: Optional[AGUISettings] = None,
+                 store: Optional[ThreadStore] = None,
+                 backplane: Optional[Backplane] = None,
+                 state_factory: Optional[Callable[[str], T]] = None):
+        settings = settings if settings is not None else AGUISettings()
         self.app = app
         self.agent = agent
+        self.settings = settings
         self._state: T = state
+        self.state_factory = state_factory
+        limits = (settings.max_concurrent_runs, settings.max_runs_per_user)
+        self.admission = (AdmissionController(*limits) if limits != (None, None) else None)
+        self.user_key = settings.user_key if settings.user_key is not None else _session_user
+        self.backplane = backplane if backplane is not None else InProcessBackplane()
+        self.connections = ConnectionRegistry()
+        self.markdown = resolve_renderer(settings.server_markdown)
+        self._state_doc: Any = None
         self.tools = tools
         self.forwarded_props = forwarded_props
         self.context = context
-        self._threads: Dict[str, AGUIThread[T]] = {}
+        self.store = store if store is not None else InMemoryThreadStore()
+        # Shared by all threads: entries are keyed by content, not by thread
+        self.render_cache = (RenderCache(settings.render_cache_size)
+                             if settings.render_cache_size else None)
+        self._ws_protocol = AGUIWebSocketProtocol
+        if settings.ws_compression is not None and AGUIWebSocketProtocol is not None:
+            self._ws_protocol = AGUIWebSocketProtocol.with_compression(settings.ws_compression)
+        self._lru = settings.max_threads is not None or settings.max_thread_bytes is not None
+        if self._lru and isinstance(self.store, InMemoryThreadStore):
+            logger.warning("max_threads/max_thread_bytes free no memory with InMemoryThreadStore, "
+                           "which keeps every thread's data; use a persistent store such as "
+                           "SQLiteThreadStore")
+        # Running total of the in-memory threads' `_approx_bytes`
+        self._thread_bytes = 0
+        self._threads: OrderedDict[str, AGUIThread[T]] = OrderedDict()
+        self.backplane.watch_changes(self._thread_changed)
         setup_ft_patches()
         self._setup_routes()
 
     def _setup_routes(self):
         @self.app.get('/agui/ui/{thread_id}/chat')
         async def ui_chat(thread_id: str, session):
-            session["thread_id"] = thread_id
+            session.setdefault(SESSION_ID_KEY, str(uuid.uuid4()))
             return self.thread(thread_id).ui.chat()
 
+        @self.app.get(ASSET_PREFIX + '/{key}')
+        def asset(key: str, request):
+            asset = get_asset(key)
+            if asset is None:
+                return Response(status_code=404)
+            return asset_response(asset, request)
+
         @self.app.get('/agui/ui/{thread_id}/state')
         async def ui_state(thread_id: str, session):
-            return self.thread(thread_id)._state.__ft__()
+            return self.thread(thread_id).render_state()
 
         @self.app.ws('/agui/ws/{thread_id}', conn=self._on_conn, disconn=self._on_disconn)
-        async def ws_handler(thread_id: str, msg: str, session):
-            await self._threads[thread_id]._handle_message(msg, session)
+        async def ws_handler(thread_id: str, session, msg: str = '', action: str = ''):
+            await self._receive(thread_id, session, msg, action)
+
+        @self.app.get('/agui/sse/{thread_id}')
+        async def sse_handler(thread_id: str, session, request):
+            return self._sse_stream(thread_id, session, request)
+
+        @self.app.get('/agui/events/{thread_id}')
+        async def events_handler(thread_id: str, run_id: Optional[str] = None, format: str = 'sse'):
+            return self._event_stream(thread_id, run_id, format)
+
+        @self.app.post('/agui/send/{thread_id}')
+        async def send_handler(thread_id: str, session, msg: str = '', action: str = ''):
+            run_id = await self._receive(thread_id, session, msg, action)
+            if msg and action != 'stop' and run_id is None:
+                return Response("Too many queued runs", status_code=429)
+            return Response(status_code=204, headers={RUN_ID_HEADER: run_id} if run_id else None)
 
         @self.app.route('/agui/run/{thread_id}/{run_id}')
         async def run_handler(thread_id: str, run_id: str):
-            return await self._threads[thread_id]._handle_run(run_id)
+            result = await self.thread(thread_id)._handle_run(run_id)
+            self._evict()
+            return result
 
         @self.app.route('/agui/messages/{thread_id}')
-        def get_messages(thread_id: str):
+        async def get_messages(thread_id: str, before: Optional[int] = None):
             thread = self.thread(thread_id)
-            if thread._messages:
-                return thread.ui._render_messages(thread._messages)
+            messages = thread._messages + thread._pending_messages()
+            if before is not None:
+                end = min(max(before, 0), len(messages))
+                start = max(0, end - self.settings.history_page_size)
+                return tuple(thread.ui._render_history_page(messages, start, end))
+            if messages:
+                return thread.ui._render_messages(messages, self.settings.history_page_size)
             return Div(id="chat-messages", cls="chat-messages")
 
     def thread(self, thread_id: str) -> AGUIThread[T]:
-        self._threads.setdefault(thread_id, AGUIThread[T](thread_id=thread_id, state=self._state, agent=self.agent))
-        return self._threads[thread_id]
+        """Return the thread for `thread_id`, only creating or loading one on a miss."""
+        try:
+            thread = self._threads[thread_id]
+        except KeyError:
+            thread = self._threads[thread_id] = self._load_thread(thread_id)
+            self._evict(keep=thread_id)
+            return thread
+        if self._lru:
+            self._threads.move_to_end(thread_id)
+        return thread
+
+    def _evict(self, keep: Optional[str] = None):
+        """Drop least recently used idle threads until within `max_threads`/`max_thread_bytes`.
+
+        Evicted threads are already persisted in the store and are rehydrated by the next
+        `thread()` call.
+        """
+        if not self._lru:
+            return
+        max_threads, max_bytes = self.settings.max_threads, self.settings.max_thread_bytes
+        for thread_id, thread in list(self._threads.items()):
+            over_count = max_threads is not None and len(self._threads) > max_threads
+            over_bytes = max_bytes is not None and self._thread_bytes > max_bytes
+            if not (over_count or over_bytes):
+                break
+            if thread_id == keep or not thread.is_idle:
+                continue
+            thread.save_state()
+            self._drop(thread_id)
+
+    def _drop(self, thread_id: str):
+        thread = self._threads.pop(thread_id)
+        thread._on_grow = None
+        self._thread_bytes -= thread._approx_bytes
+
+    def _load_thread(self, thread_id: str) -> AGUIThread[T]:
+        """Create a thread, hydrating it from the store if it has persisted data.
+
+        Without a `state_factory` the thread starts out sharing the initial state.
+        """
+        state = self.state_factory(thread_id) if self.state_factory is not None else self._state
+        thread = AGUIThread(thread_id, state, self.agent, self.settings, store=self.store,
+                            backplane=self.backplane, render_cache=self.render_cache,
+                            admission=self.admission, markdown=self.markdown)
+        if self.state_factory is None:
+            if self._state_doc is None:
+                self._state_doc = _dump_state(self._state)
+            thread._share_state(self._state_doc)
+        thread._on_grow = self._thread_grew
+        record = self.store.load(thread_id)
+        if record is not None:
+            thread._hydrate(record)
+        return thread
+
+    def _thread_grew(self, size: int):
+        self._thread_bytes += size
+
+    def _thread_changed(self, thread_id: str):
+        """Another process changed `thread_id` in the store: drop or reload the cached copy.
 
-    def _on_conn(self, ws, send, session):
-        self.thread(session["thread_id"]).subscribe(str(id(ws)), send)
+        A thread in use here is reloaded in place, or after its current run if one is streaming.
+        In-place state edits not saved yet are saved first, as on eviction.
+        """
+        thread = self._threads.get(thread_id)
+        if thread is None:
+            return
+        if thread._active is not None:
+            thread._stale = True
+            return
+        thread.save_state()
+        if thread.is_idle:
+            self._drop(thread_id)
+        else:
+            thread._reload()
+
+    async def _receive(self, thread_id: str, session, msg: str, action: str) -> Optional[str]:
+        """Handle input from the chat UI, whichever transport it came over.
+
+        Returns the id of the run a message started, if any.
+        """
+        if action == 'stop':
+            await self.thread(thread_id).cancel_run()
+        elif msg:
+            return await self.thread(thread_id)._handle_message(msg, session,
+                                                                user=self.user_key(session))
+        return None
+
+    def _sse_stream(self, thread_id: str, session, request) -> StreamingResponse:
+        """Subscribe an SSE connection to the thread and stream its frames as events.
+
+        Each event's `id` is the frame's replay cursor, so the browser's own reconnect
+        resumes through `Last-Event-ID`.
+        """
+        thread = self.thread(thread_id)
+        conn = self.connections.add(thread_id, session.get(SESSION_ID_KEY))
+        # Holds one frame so the connection's writer waits for the client to keep up
+        frames: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+        async def close():
+            # Never wait for room: the client may be gone with a frame still queued. The
+            # writer is already stopped, so drop what it left and end the stream.
+            while not frames.empty():
+                frames.get_nowait()
+            frames.put_nowait(None)
+
+        resume = request.headers.get('last-event-id') or request.query_params.get('resume')
+        thread.subscribe(conn.id, frames.put, close, resume=resume)
+
+        async def stream():
+            try:
+                while True:
+                    try:
+                        frame = await asyncio.wait_for(frames.get(), SSE_KEEPALIVE)
+                    except asyncio.TimeoutError:
+                        yield ": keepalive\n\n"
+                        continue
+                    if frame is None:
+                        return
+                    yield sse_event(frame, id=getattr(frame, 'cursor', None))
+            finally:
+                if self.connections.remove(conn.id) is not None:
+                    self.thread(thread_id).unsubscribe(conn.id)
 
-    def _on_disconn(self, ws, session):
-        self.thread(session["thread_id"]).unsubscribe(str(id(ws)))
+        return StreamingResponse(stream(), media_type="text/event-stream",
+                                 headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    def _event_stream(self, thread_id: str, run_id: Optional[str], format: EventFormat):
+        """Stream the raw AG-UI events of a thread's runs, or of one run from its start.
+
+        Events come from the runs the chat UI triggers; no run is started here.
+        """
+        if format not in MEDIA_TYPES:
+            return Response(f"Unknown format: {format}", status_code=400)
+        thread = self.thread(thread_id)
+        if run_id is not None:
+            thread._runs.expire()
+            record = thread._runs.get(run_id)
+            if record is None or record.events is None:
+                # Unknown, or finished too long ago to replay
+                return Response("Run not found", status_code=404)
+        stream = thread.open_event_stream(run_id)
+        keepalive = ": keepalive\n\n" if format == 'sse' else "\n"
+
+        async def events():
+            try:
+                while True:
+                    try:
+                        event = await stream.get(SSE_KEEPALIVE)
+                    except asyncio.TimeoutError:
+                        # A pending run can expire or be cancelled without emitting events
+                        if run_id is not None:
+                            record = thread._runs.get(run_id)
+                            if record is None or record.done:
+                                return
+                        yield keepalive
+                        continue
+                    if event is None:
+                        return
+                    yield encode_event(event, format)
+            finally:
+                thread.close_event_stream(stream)
+
+        return StreamingResponse(events(), media_type=MEDIA_TYPES[format],
+                                 headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    async def _on_conn(self, ws, send, session, thread_id: str):
+        conn = self.connections.add(thread_id, session.get(SESSION_ID_KEY), ws)
+        self.thread(thread_id).subscribe(conn.id, send, ws.close,
+                                         resume=ws.query_params.get('resume'))
+
+    async def _on_disconn(self, ws):
+        conn = self.connections.remove(connection_id(ws))
+        if conn is not None:
+            self.thread(conn.thread_id).unsubscribe(conn.id)
+
+    @property
+    def ws_protocol(self):
+        """uvicorn WebSocket protocol applying `ws_compression`; pass as `serve(ws=...)`."""
+        return self._ws_protocol
 
     def state(self, thread_id):
         return self.thread(thread_id).ui.state_loader()
@@ -362,11 +1169,19 @@ class AGUISetup(Generic[T]):
     def get_suggestions(self, thread_id: str) -> List[str]:
         return self.thread(thread_id).get_suggestions()
 
+    def connection_stats(self, thread_id: str) -> Dict[str, Dict[str, int]]:
+        return self.thread(thread_id).connection_stats()
+
 
 def setup_agui(app, agent: Agent, initial_state: T = None, state_type: type[T] = None,
                tools: Optional[List[Tool]] = [],
                forwarded_props: Any = {},
-               context: List[Context] = []) -> AGUISetup[T]:
+               context: List[Context] = [],
+               settings: Optional[AGUISettings] = None,
+               store: Optional[ThreadStore] = None,
+               backplane: Optional[Backplane] = None,
+               state_factory: Optional[Callable[[str], T]] = None,
+               **options) -> AGUISetup[T]:
     """
     Setup AGUI for a FastHTML application.
 
@@ -375,6 +1190,14 @@ def setup_agui(app, agent: Agent, initial_state: T = None, state_type: type[T] =
         agent: pydantic-ai Agent instance
         initial_state: Initial state of the AGUI (optional)
         state_type: Pydantic model for managing state (optional)
+        settings: AGUISettings with the streaming, memory, run and rendering options
+        store: ThreadStore used to persist and lazily reload threads
+            (defaults to an InMemoryThreadStore)
+        backplane: Fans frames out to connections in other processes, e.g. a
+            RedisBackplane when running several workers (defaults to in-process only)
+        state_factory: Called with a thread id to create that thread's initial state.
+            Without it threads share `initial_state` until their state first changes
+        **options: AGUISettings fields, overriding those in `settings`
 
     Returns:
         AGUISetup instance with chat() and state() methods
@@ -384,4 +1207,6 @@ def setup_agui(app, agent: Agent, initial_state: T = None, state_type: type[T] =
         state = state_type.model_validate_json(json)
     else:
         state = initial_state
-    return AGUISetup[T](app, agent, state, tools, forwarded_props, context)
+    settings = replace(settings if settings is not None else AGUISettings(), **options)
+    return AGUISetup[T](app, agent, state, tools, forwarded_props, context, settings,
+                        store=store, backplane=backplane, state_factory=state_factory)
@@ -0,0 +1,70 @@
+"""Raw AG-UI event streams for clients that don't render HTML.
+
+A thread passes every event of its runs to the open `EventStream`s, alongside the HTML
+frames it sends to the chat UI, so CLI tools and other clients can follow the same runs
+without starting their own.
+"""
+import asyncio
+from typing import AsyncIterator, Literal, Optional
+
+from ag_ui.core.events import BaseEvent, EventType
+from ag_ui.encoder import EventEncoder
+
+EventFormat = Literal['sse', 'jsonl']
+
+MEDIA_TYPES = {'sse': EventEncoder().get_content_type(), 'jsonl': 'application/x-ndjson'}
+
+# Events ending a run, after which a stream following only that run closes
+TERMINAL_EVENTS = {EventType.RUN_FINISHED, EventType.RUN_ERROR}
+
+
+def encode_event(event: BaseEvent, format: EventFormat = 'sse') -> str:
+    """Serialize `event` as a Server-Sent Event using the AG-UI encoder, or as one JSON line."""
+    if format == 'jsonl':
+        return event.model_dump_json(by_alias=True) + "\n"
+    return EventEncoder().encode(event)
+
+
+class EventStream:
+    """The AG-UI events of a thread's runs, or of just `run_id`, queued for one consumer.
+
+    If the consumer falls `max_queue` events behind, the stream is closed rather than
+    dropping events from the middle of a run.
+    """
+
+    def __init__(self, run_id: Optional[str] = None, max_queue: int = 256):
+        self.run_id = run_id
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue + 1)
+        self.max_queue = max_queue
+        self.closed = False
+
+    def put(self, event: BaseEvent, run_id: Optional[str] = None) -> bool:
+        """Queue `event` of run `run_id` if this stream follows it. Returns False once closed."""
+        if self.closed:
+            return False
+        if self.run_id is not None and run_id != self.run_id:
+            return True
+        if self._queue.qsize() >= self.max_queue:
+            self.close()
+            return False
+        self._queue.put_nowait(event)
+        if self.run_id is not None and event.type in TERMINAL_EVENTS:
+            self.close()
+        return True
+
+    def close(self):
+        """End the stream after the events already queued."""
+        if not self.closed:
+            self.closed = True
+            self._queue.put_nowait(None)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[BaseEvent]:
+        """The next event, or None once the stream has ended.
+
+        Raises `asyncio.TimeoutError` if nothing arrives within `timeout` seconds.
+        """
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    async def __aiter__(self) -> AsyncIterator[BaseEvent]:
+        while (event := await self.get()) is not None:
+            yield event
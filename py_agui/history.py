@@ -0,0 +1,147 @@
+"""History policies: bound the conversation context sent to the agent on each run.
+
+The thread keeps its full transcript for display; a policy picks the part of it the agent
+sees. Cuts are made at turn boundaries (a turn starts at a user message) so an assistant
+reply is never separated from the message it answers.
+"""
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Union
+
+from ag_ui.core.types import BaseMessage
+from pydantic_ai import Agent
+
+
+@dataclass
+class HistoryWindow:
+    """What a run gets to see: recent messages plus an optional summary of older ones."""
+    messages: List[BaseMessage]
+    summary: Optional[str] = None
+
+
+@dataclass
+class HistorySummary:
+    """Rolling summary kept on a thread: `text` covers the first `upto` messages."""
+    text: str
+    upto: int
+
+
+def turn_starts(messages: Sequence[BaseMessage]) -> List[int]:
+    """Indexes of the messages that start a turn."""
+    starts = [i for i, m in enumerate(messages) if m.role == 'user']
+    return starts if starts and starts[0] == 0 else [0, *starts]
+
+
+def approx_tokens(message: BaseMessage) -> int:
+    """Rough token count: about four characters per token plus per-message overhead."""
+    content = message.content
+    text = content if isinstance(content, str) else str(content or '')
+    return len(text) // 4 + 4
+
+
+class HistoryPolicy:
+    """Selects the messages sent to the agent for a run. The default sends everything."""
+
+    async def select(self, thread: Any, messages: List[BaseMessage]) -> HistoryWindow:
+        return HistoryWindow(list(messages))
+
+
+class FullHistory(HistoryPolicy):
+    """Send the whole transcript."""
+
+
+class LastTurns(HistoryPolicy):
+    """Send only the last `turns` turns."""
+
+    def __init__(self, turns: int = 10):
+        if turns < 1:
+            raise ValueError("turns must be at least 1")
+        self.turns = turns
+
+    async def select(self, thread: Any, messages: List[BaseMessage]) -> HistoryWindow:
+        starts = turn_starts(messages)
+        start = starts[-self.turns] if len(starts) > self.turns else 0
+        return HistoryWindow(messages[start:])
+
+
+class TokenBudget(HistoryPolicy):
+    """Send the most recent whole turns that fit in `max_tokens`.
+
+    The latest turn is always sent, even if it alone exceeds the budget. `count_tokens`
+    estimates the size of one message; pass a real tokenizer for accurate budgets.
+    """
+
+    def __init__(self, max_tokens: int = 4000,
+                 count_tokens: Callable[[BaseMessage], int] = approx_tokens):
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens
+
+    async def select(self, thread: Any, messages: List[BaseMessage]) -> HistoryWindow:
+        return HistoryWindow(messages[self._start(messages):])
+
+    def _start(self, messages: List[BaseMessage]) -> int:
+        total = 0
+        start = end = len(messages)
+        for turn_start in reversed(turn_starts(messages)):
+            total += sum(self.count_tokens(m) for m in messages[turn_start:end])
+            if total > self.max_tokens and start < len(messages):
+                break
+            start = end = turn_start
+        return start
+
+
+Summarizer = Union[Agent, Callable[[Optional[str], List[BaseMessage]], Awaitable[str]]]
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and an assistant.
+Keep facts, decisions, names and open questions; drop small talk. Reply with the summary only.
+
+Current summary:
+{summary}
+
+New messages:
+{transcript}"""
+
+
+class RollingSummary(HistoryPolicy):
+    """Send the last `keep_turns` turns verbatim and a rolling summary of everything before.
+
+    The summary is saved with the thread and extended incrementally: once
+    `summarize_every` turns have fallen out of the window, they are folded into it with
+    `summarizer`, which is either a pydantic-ai `Agent` or an async callable taking the
+    previous summary (or None) and the messages to fold in. Each call folds at most
+    `summarize_every` turns, so a long backlog (e.g. a thread that predates the policy) is
+    caught up in several bounded calls.
+    """
+
+    def __init__(self, summarizer: Summarizer, keep_turns: int = 4, summarize_every: int = 2):
+        self.summarizer = summarizer
+        self.keep_turns = keep_turns
+        self.summarize_every = summarize_every
+
+    async def select(self, thread: Any, messages: List[BaseMessage]) -> HistoryWindow:
+        starts = turn_starts(messages)
+        if len(starts) <= self.keep_turns:
+            return HistoryWindow(list(messages))
+        cut = starts[-self.keep_turns]
+        summary: Optional[HistorySummary] = thread.history_summary
+        if summary is not None and summary.upto > cut:
+            summary = None
+        upto = summary.upto if summary is not None else 0
+        pending = [s for s in starts if upto <= s < cut]
+        if len(pending) >= self.summarize_every:
+            # Fold whole batches of `summarize_every` turns, keeping a partial batch unsummarized
+            batches = pending[::self.summarize_every]
+            ends = [*batches[1:], cut]
+            for end in ends[:len(pending) // self.summarize_every]:
+                text = await self._summarize(summary.text if summary else None, messages[upto:end])
+                summary = HistorySummary(text, end)
+                upto = end
+            thread.history_summary = summary
+        return HistoryWindow(messages[upto:], summary.text if summary is not None else None)
+
+    async def _summarize(self, previous: Optional[str], messages: List[BaseMessage]) -> str:
+        if not isinstance(self.summarizer, Agent):
+            return await self.summarizer(previous, messages)
+        transcript = "\n".join(f"{m.role}: {m.content}" for m in messages)
+        prompt = SUMMARY_PROMPT.format(summary=previous or "(none)", transcript=transcript)
+        result = await self.summarizer.run(prompt)
+        return str(result.output)
@@ -1,12 +1,13 @@
 """Pre-built layout components including the 3-pane agentic UI."""
 from fasthtml.common import *
-from .styles import get_chat_styles, get_custom_theme
+from .scripts import chat_script_tag
+from .styles import chat_styles_link
 
 
 def chat_with_sidebar(chat_component, sidebar_component, **kwargs):
     """Standard 2-column layout: sidebar + chat."""
     return Div(
-        get_chat_styles(),
+        chat_styles_link(),
         Div(
             Div(sidebar_component, cls="chat-layout-sidebar"),
             Div(chat_component, cls="chat-layout-main"),
@@ -19,7 +20,7 @@ def chat_with_sidebar(chat_component, sidebar_component, **kwargs):
 def simple_chat(chat_component, **kwargs):
     """Full-width chat layout."""
     return Div(
-        get_chat_styles(),
+        chat_styles_link(),
         Div(chat_component, style="height: 100vh; padding: 1rem;"),
         **kwargs
     )
@@ -106,17 +107,9 @@ def three_pane_layout(
         cls="agui-header"
     )
 
-    # Update badge script
-    badge_script = Script("""
-        function updateThinkingBadge(count) {
-            const badge = document.getElementById('thinking-badge');
-            if (badge) badge.textContent = count;
-        }
-    """)
-
     return Div(
-        get_chat_styles(),
-        badge_script,
+        chat_styles_link(),
+        chat_script_tag(),
         Div(
             # Left: settings
             Div(
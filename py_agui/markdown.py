@@ -0,0 +1,36 @@
+"""Server-side Markdown rendering of finalized chat messages.
+
+By default the browser renders every message with marked.js, on every page load. With
+server-side rendering each message is turned into HTML once, cached by message id and
+content hash, and persisted with the thread, so clients receive ready HTML.
+"""
+import hashlib
+from typing import Callable, Optional
+
+MarkdownRenderer = Callable[[str], str]
+
+
+def content_digest(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def default_renderer() -> MarkdownRenderer:
+    """CommonMark renderer with raw HTML disabled, from the optional markdown-it-py package.
+
+    With `html` off, HTML in messages is escaped rather than passed through, and links and
+    images with unsafe schemes (`javascript:` and the like) are not rendered as links.
+    """
+    try:
+        from markdown_it import MarkdownIt
+    except ImportError:
+        raise ImportError("Server-side Markdown needs markdown-it-py: "
+                          "pip install 'py-agui[markdown]'") from None
+    md = MarkdownIt('commonmark', {'html': False}).enable(['table', 'strikethrough'])
+    return md.render
+
+
+def resolve_renderer(markdown: 'bool | MarkdownRenderer') -> Optional[MarkdownRenderer]:
+    """The renderer for a `server_markdown` setting: None, the default, or a callable."""
+    if callable(markdown):
+        return markdown
+    return default_renderer() if markdown else None
@@ -0,0 +1,95 @@
+"""Memoized rendering of Pydantic `__ft__` components.
+
+`cached(obj)` renders a model through the active `RenderCache`, reusing the HTML from a
+previous render when a model of the same type has the same content. The cache is active
+while the state panel renders, so in a state model's `__ft__`:
+
+    def __ft__(self):
+        return Div(*[cached(c) for c in self.contacts], id="agui-state", hx_swap_oob="innerHTML")
+
+only contacts that changed since the last render run their own `__ft__`. Components must
+render from their fields alone for this to be correct.
+"""
+import hashlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Hashable, Iterator, Optional, Tuple
+
+from fasthtml.common import Safe, to_xml
+from pydantic import BaseModel
+
+_active_cache: ContextVar[Optional['RenderCache']] = ContextVar('_active_cache', default=None)
+
+
+def content_hash(model: BaseModel) -> bytes:
+    return hashlib.blake2b(model.model_dump_json().encode(), digest_size=16).digest()
+
+
+class RenderCache:
+    """Bounded LRU cache of rendered HTML keyed by model type, content hash and an extra key."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, Tuple[Safe, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Tuple[Safe, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, html: Safe, extra: Any = None):
+        self._entries[key] = (html, extra)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def key(self, model: BaseModel, *extra: Hashable) -> Hashable:
+        return (type(model), content_hash(model), *extra)
+
+    def render(self, model: BaseModel) -> Safe:
+        key = self.key(model)
+        entry = self.get(key)
+        if entry is not None:
+            return entry[0]
+        html = Safe(to_xml(model.__ft__(), indent=False))
+        self.put(key, html)
+        return html
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {'size': len(self._entries), 'maxsize': self.maxsize,
+                'hits': self.hits, 'misses': self.misses}
+
+
+def active_cache() -> Optional[RenderCache]:
+    return _active_cache.get()
+
+
+@contextmanager
+def use_render_cache(cache: Optional[RenderCache]) -> Iterator[Optional[RenderCache]]:
+    """Make `cache` the one `cached()` and `keyed()` render through inside the block."""
+    token = _active_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _active_cache.reset(token)
+
+
+def cached(obj: Any):
+    """Render `obj` through the active `RenderCache`, or call its `__ft__` if there is none."""
+    cache = _active_cache.get()
+    if cache is None or not isinstance(obj, BaseModel) or not hasattr(obj, '__ft__'):
+        return obj.__ft__() if hasattr(obj, '__ft__') else obj
+    return cache.render(obj)
@@ -0,0 +1,255 @@
+"""Agent run bookkeeping: lifecycle states, pending-run expiry, compact summaries and
+admission control."""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from ag_ui.core.events import BaseEvent
+from ag_ui.core.types import BaseMessage, RunAgentInput
+
+
+class RunStatus(str, Enum):
+    PENDING = "pending"
+    QUEUED = "queued"
+    RUNNING = "running"
+    FINISHED = "finished"
+    ERROR = "error"
+    CANCELLED = "cancelled"
+    EXPIRED = "expired"
+
+
+@dataclass
+class RunRecord:
+    """A run and its lifecycle timestamps.
+
+    `message` is the user message the run answers. It joins the thread's transcript when
+    the run starts, which is also when `input` is built. Both are dropped once the run is done.
+    `events` are the AG-UI events the run emitted, replayed to streams that start following
+    it late; they are kept for a while after the run ends and are None once released.
+    """
+    run_id: str
+    input: Optional[RunAgentInput] = None
+    message: Optional[BaseMessage] = None
+    status: RunStatus = RunStatus.PENDING
+    created_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    message_id: Optional[str] = None
+    error: Optional[str] = None
+    # Admission control key: who submitted the run
+    user: Optional[str] = None
+    events: Optional[List[BaseEvent]] = field(default_factory=list, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status not in (RunStatus.PENDING, RunStatus.QUEUED, RunStatus.RUNNING)
+
+
+class RunRegistry:
+    """Tracks the runs of one thread.
+
+    A run is pending until it is requested, queued while it waits for the thread's
+    previous run to end, then running. Live runs keep their message and, once running,
+    their `RunAgentInput`. Once a run finishes it is compacted to a summary record (message
+    and input dropped) and kept in a bounded history, so
+    memory follows active work rather than the number of turns. Pending runs that are
+    not claimed within `pending_ttl` seconds expire, and finished runs release their
+    events `pending_ttl` seconds after they end.
+    """
+
+    def __init__(self, pending_ttl: float = 300, history: int = 20):
+        self.pending_ttl = pending_ttl
+        self._live: Dict[str, RunRecord] = {}
+        self._finished: Deque[RunRecord] = deque(maxlen=history)
+
+    def __contains__(self, run_id: str) -> bool:
+        return run_id in self._live
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    @property
+    def active(self) -> int:
+        """Number of pending, queued or running runs."""
+        self.expire()
+        return len(self._live)
+
+    def add(self, run_id: str, message: Optional[BaseMessage] = None,
+            user: Optional[str] = None) -> RunRecord:
+        self.expire()
+        record = self._live[run_id] = RunRecord(run_id=run_id, message=message, user=user)
+        return record
+
+    def claim(self, run_id: str) -> Optional[RunRecord]:
+        """Mark a pending run as queued.
+
+        Returns None if it is unknown, expired or already claimed.
+        """
+        self.expire()
+        record = self._live.get(run_id)
+        if record is None or record.status != RunStatus.PENDING:
+            return None
+        record.status = RunStatus.QUEUED
+        return record
+
+    def start(self, record: RunRecord):
+        record.status = RunStatus.RUNNING
+        record.started_at = time.monotonic()
+
+    @property
+    def running(self) -> Optional[RunRecord]:
+        return next((r for r in self._live.values() if r.status == RunStatus.RUNNING), None)
+
+    def waiting(self) -> List[RunRecord]:
+        """Pending and queued runs, in submission order."""
+        return [r for r in self._live.values()
+                if r.status in (RunStatus.PENDING, RunStatus.QUEUED)]
+
+    def finish(self, record: RunRecord, status: RunStatus = RunStatus.FINISHED,
+               error: Optional[str] = None):
+        """Compact a run to its summary and move it to the finished history."""
+        self._live.pop(record.run_id, None)
+        record.status = status
+        record.error = error
+        record.input = None
+        record.message = None
+        record.finished_at = time.monotonic()
+        self._finished.append(record)
+
+    def expire(self):
+        now = time.monotonic()
+        expired = [r for r in self._live.values()
+                   if r.status == RunStatus.PENDING and now - r.created_at > self.pending_ttl]
+        for record in expired:
+            self.finish(record, RunStatus.EXPIRED)
+        for record in self._finished:
+            if record.events is not None and now - record.finished_at > self.pending_ttl:
+                record.events = None
+
+    def get(self, run_id: str) -> Optional[RunRecord]:
+        record = self._live.get(run_id)
+        if record is not None:
+            return record
+        return next((r for r in self._finished if r.run_id == run_id), None)
+
+    def history(self) -> List[RunRecord]:
+        """Recent finished run summaries followed by the live runs."""
+        return [*self._finished, *self._live.values()]
+
+
+class _Waiter:
+    __slots__ = ('user', 'granted', 'changed')
+
+    def __init__(self, user: str):
+        self.user = user
+        self.granted = False
+        self.changed = asyncio.Event()
+
+
+class AdmissionController:
+    """Process-wide limit on concurrently streaming runs.
+
+    At most `max_concurrent` runs stream at once, and at most `max_per_user` per user key.
+    Runs beyond that wait, and free slots are granted round-robin across users, in
+    submission order for each user. Since each thread streams one run at a time, this is
+    also fair across threads.
+    """
+
+    def __init__(self, max_concurrent: Optional[int] = None, max_per_user: Optional[int] = None):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self._running: Dict[str, int] = {}
+        self._waiting: Dict[str, Deque[_Waiter]] = {}
+
+    @property
+    def running(self) -> int:
+        return sum(self._running.values())
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self._waiting.values())
+
+    def _has_slot(self, user: str) -> bool:
+        if self.max_concurrent is not None and self.running >= self.max_concurrent:
+            return False
+        return self.max_per_user is None or self._running.get(user, 0) < self.max_per_user
+
+    def _order(self) -> List[_Waiter]:
+        """Waiters in the order they would be granted a slot if all users had capacity."""
+        queues = list(self._waiting.values())
+        return [q[i] for i in range(max(map(len, queues), default=0)) for q in queues if i < len(q)]
+
+    def position(self, waiter: _Waiter) -> int:
+        """1-based place of `waiter` in the queue."""
+        return self._order().index(waiter) + 1
+
+    def _grant(self):
+        """Hand free slots to waiting users in round-robin order."""
+        progress = True
+        while progress and self._waiting:
+            progress = False
+            for user in list(self._waiting):
+                if not self._has_slot(user):
+                    continue
+                queue = self._waiting.pop(user)
+                waiter = queue.popleft()
+                if queue:
+                    # Re-inserting moves this user to the back of the rotation
+                    self._waiting[user] = queue
+                self._running[user] = self._running.get(user, 0) + 1
+                waiter.granted = True
+                waiter.changed.set()
+                progress = True
+        for queue in self._waiting.values():
+            for waiter in queue:
+                waiter.changed.set()
+
+    def _release(self, user: str):
+        count = self._running.get(user, 0) - 1
+        if count > 0:
+            self._running[user] = count
+        else:
+            self._running.pop(user, None)
+        self._grant()
+
+    @asynccontextmanager
+    async def slot(self, user: str, on_wait: Optional[Callable[[int], Awaitable[None]]] = None):
+        """Hold a run slot for `user` for the duration of the block.
+
+        While waiting, `on_wait` is called with the queue position whenever it changes.
+        """
+        waiter = _Waiter(user)
+        self._waiting.setdefault(user, deque()).append(waiter)
+        self._grant()
+        try:
+            last = None
+            while not waiter.granted:
+                position = self.position(waiter)
+                if on_wait is not None and position != last:
+                    await on_wait(position)
+                    last = position
+                    if waiter.granted:
+                        break
+                waiter.changed.clear()
+                await waiter.changed.wait()
+        except BaseException:
+            if waiter.granted:
+                self._release(user)
+            else:
+                queue = self._waiting.get(user)
+                queue.remove(waiter)
+                if not queue:
+                    del self._waiting[user]
+                self._grant()
+            raise
+        try:
+            yield
+        finally:
+            self._release(user)
+
+    def stats(self) -> Dict[str, int]:
+        return {'running': self.running, 'waiting': self.waiting, 'users': len(self._running)}
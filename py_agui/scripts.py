@@ -0,0 +1,112 @@
+"""Client-side helpers for the chat UI, bundled as one cached static asset."""
+from .assets import register_asset
+
+CHAT_UI_SCRIPT = """
+function autoResize(textarea) {
+    textarea.style.height = 'auto';
+    const maxHeight = 10 * 16;
+    const newHeight = Math.min(textarea.scrollHeight, maxHeight);
+    textarea.style.height = newHeight + 'px';
+    textarea.style.overflowY = textarea.scrollHeight > maxHeight ? 'auto' : 'hidden';
+}
+function handleKeyDown(textarea, event) {
+    autoResize(textarea);
+    if (event.key === 'Enter' && !event.shiftKey) {
+        event.preventDefault();
+        const form = textarea.closest('form');
+        if (form && textarea.value.trim()) form.requestSubmit();
+    }
+}
+function renderMarkdown(elementId) {
+    setTimeout(() => {
+        const el = document.getElementById(elementId);
+        if (el && window.marked && el.classList.contains('marked')) {
+            el.innerHTML = marked.parse(el.textContent || '');
+        }
+    }, 10);
+}
+function updateThinkingBadge(count) {
+    const badge = document.getElementById('thinking-badge');
+    if (badge) badge.textContent = count;
+}
+// Reconnect where the stream left off: frames carry a replay cursor in #agui-seq-{thread},
+// sent back as ?resume= so the server replays only the frames missed in between.
+function aguiResumeUrl(url) {
+    const m = url.match(/\\/agui\\/(?:ws|sse)\\/([^/?#]+)/);
+    const marker = m && document.getElementById('agui-seq-' + decodeURIComponent(m[1]));
+    if (!marker || !marker.dataset.seq) return url;
+    const seq = encodeURIComponent(marker.dataset.seq);
+    return url + (url.includes('?') ? '&' : '?') + 'resume=' + seq;
+}
+// A frame only carries a cursor where the numbering jumps. When a frame leaves the marker
+// as it was, it is the frame after the previous one, so advance the cursor by one.
+function aguiSeqMarker(event) {
+    const chat = event.target.closest && event.target.closest('[data-agui-thread]');
+    return chat && [chat, document.getElementById('agui-seq-' + chat.dataset.aguiThread)];
+}
+function aguiBeforeFrame(event) {
+    const found = aguiSeqMarker(event);
+    if (found && found[1]) found[0].aguiSeq = found[1].dataset.seq;
+}
+function aguiAfterFrame(event) {
+    const found = aguiSeqMarker(event);
+    if (!found || !found[1] || found[1].dataset.seq !== found[0].aguiSeq) return;
+    const m = found[1].dataset.seq.match(/^(.*):(\\d+)$/);
+    if (m) found[1].dataset.seq = m[1] + ':' + (Number(m[2]) + 1);
+}
+if (window.htmx && !htmx.aguiResume) {
+    htmx.aguiResume = true;
+    const createWebSocket = htmx.createWebSocket || (url => new WebSocket(url, []));
+    htmx.createWebSocket = url => createWebSocket(aguiResumeUrl(url));
+    const createEventSource = htmx.createEventSource
+        || (url => new EventSource(url, {withCredentials: true}));
+    htmx.createEventSource = url => createEventSource(aguiResumeUrl(url));
+    document.addEventListener('htmx:wsBeforeMessage', aguiBeforeFrame);
+    document.addEventListener('htmx:wsAfterMessage', aguiAfterFrame);
+    document.addEventListener('htmx:sseBeforeMessage', aguiBeforeFrame);
+    document.addEventListener('htmx:sseMessage', aguiAfterFrame);
+}
+// Keep #chat-messages scrolled to the bottom for chats rendered with data-autoscroll.
+// Observes the whole document so it survives #chat-messages being swapped out.
+// A page of earlier messages loads above what the user is reading, so instead of
+// scrolling to the bottom keep the same distance from the bottom of the list.
+if (!window.aguiAutoscroll) {
+    window.aguiScrollAnchor = null;
+    document.addEventListener('htmx:beforeSwap', e => {
+        const msgs = document.getElementById('chat-messages');
+        if (!msgs || !e.detail.target.classList.contains('chat-history-sentinel')) return;
+        window.aguiScrollAnchor = msgs.scrollHeight - msgs.scrollTop;
+        // The swap and its mutation callback happen before this runs
+        setTimeout(() => { window.aguiScrollAnchor = null; }, 0);
+    });
+    window.aguiAutoscroll = new MutationObserver(mutations => {
+        const msgs = document.getElementById('chat-messages');
+        if (!msgs) return;
+        if (!mutations.some(m => msgs.contains(m.target) || m.target.contains(msgs))) return;
+        if (window.aguiScrollAnchor !== null) {
+            msgs.scrollTop = msgs.scrollHeight - window.aguiScrollAnchor;
+            window.aguiScrollAnchor = null;
+        } else if (msgs.closest('[data-autoscroll]')) {
+            msgs.scrollTop = msgs.scrollHeight;
+        }
+    });
+    window.aguiAutoscroll.observe(document.body, {childList: true, subtree: true});
+}
+"""
+
+
+def chat_script_tag():
+    """Script tag for the chat helpers, served by AGUISetup as a cached, precompressed asset."""
+    from fasthtml.common import Script
+    asset = register_asset("agui-chat", CHAT_UI_SCRIPT, "text/javascript")
+    return Script(src=asset.url, defer=True)
+
+
+# htmx Server-Sent Events extension, used by the chat UI with `transport='sse'`
+SSE_EXT_SRC = "https://cdn.jsdelivr.net/npm/htmx-ext-sse@2.2.2/sse.js"
+
+
+def sse_ext_script():
+    """Script tag loading the htmx sse extension; add it to the app's `hdrs`."""
+    from fasthtml.common import Script
+    return Script(src=SSE_EXT_SRC)
@@ -0,0 +1,82 @@
+"""Tuning options shared by an AGUISetup and all of its threads."""
+from dataclasses import dataclass
+from typing import Any, Callable, Literal, Optional, Union
+
+from .compression import WSCompression
+from .history import HistoryPolicy
+from .markdown import MarkdownRenderer
+from .streaming import OverflowPolicy
+
+# How the chat UI receives frames and sends input: a WebSocket, or Server-Sent Events
+# plus ordinary POST requests
+Transport = Literal['ws', 'sse']
+
+
+@dataclass
+class AGUISettings:
+    """Options for streaming, memory, runs and rendering, set once per AGUISetup.
+
+    `setup_agui` takes every field as a keyword argument too.
+
+    Attributes:
+        flush_interval_ms: Max time streamed text deltas are buffered before being sent
+            as one frame (0 sends every delta as its own frame)
+        flush_max_bytes: Buffered delta size that triggers an early flush
+        max_queue: Max frames queued per connection before `overflow_policy` applies
+        overflow_policy: What to do with a connection that falls behind:
+            'drop-oldest', 'coalesce' or 'disconnect'
+        history_page_size: Messages rendered on initial load; earlier ones are fetched
+            in pages of this size as the user scrolls up
+        max_threads: Max threads kept in memory; least recently used idle threads
+            beyond this are evicted and reloaded from the store on next access
+        max_thread_bytes: Approximate memory cap across in-memory threads. Both caps
+            need a persistent store; an InMemoryThreadStore still holds evicted threads
+        run_ttl: Seconds a pending run may wait to be started before it expires, and
+            that a finished run's events stay available to `?run_id=` event streams
+        run_history: Finished run summaries kept per thread
+        server_side_runs: Start agent runs as server-side tasks straight from the
+            WebSocket handler instead of via a client-issued /agui/run request
+        ws_compression: permessage-deflate settings for /agui/ws; takes effect when the
+            server runs with `ws=agui.ws_protocol`
+        keyed_state: On state snapshots and deltas, re-render only the sub-components
+            marked with `keyed()` that changed instead of the whole state panel
+        render_cache_size: Max rendered components memoized for `keyed()` and `cached()`
+            (0 disables the cache)
+        history_policy: Bounds the conversation context sent to the agent on each run
+            (LastTurns, TokenBudget, RollingSummary); defaults to the full transcript
+        max_queued_runs: Runs that may wait behind a thread's running run; messages
+            beyond that are rejected until the thread catches up
+        max_concurrent_runs: Max runs streaming at once across all threads; further runs
+            wait, with their queue position shown in the chat status line
+        max_runs_per_user: Max runs streaming at once per user (see `user_key`)
+        user_key: Maps a session to the user key used for `max_runs_per_user` and fair
+            queuing (defaults to a per-browser-session id)
+        replay_buffer: Recent frames kept per thread and replayed to a client that
+            reconnects after a drop (0 disables replay)
+        transport: 'ws' for a WebSocket, or 'sse' for Server-Sent Events with input
+            posted to /agui/send (needs the htmx sse extension, see `sse_ext_script`)
+        server_markdown: Render messages from Markdown on the server instead of with
+            marked.js: True for the built-in sanitizing renderer (needs markdown-it-py),
+            or a callable turning Markdown into safe HTML
+    """
+    flush_interval_ms: float = 50
+    flush_max_bytes: int = 4096
+    max_queue: int = 256
+    overflow_policy: OverflowPolicy = 'coalesce'
+    history_page_size: int = 50
+    max_threads: Optional[int] = None
+    max_thread_bytes: Optional[int] = None
+    run_ttl: float = 300
+    run_history: int = 20
+    server_side_runs: bool = False
+    ws_compression: Optional[WSCompression] = None
+    keyed_state: bool = False
+    render_cache_size: int = 1024
+    history_policy: Optional[HistoryPolicy] = None
+    max_queued_runs: int = 1
+    max_concurrent_runs: Optional[int] = None
+    max_runs_per_user: Optional[int] = None
+    user_key: Optional[Callable[[Any], Optional[str]]] = None
+    replay_buffer: int = 256
+    transport: Transport = 'ws'
+    server_markdown: Union[bool, MarkdownRenderer] = False
@@ -0,0 +1,313 @@
+"""State updates: RFC 6902 JSON Patch application and keyed partial rendering of the state panel.
+
+In keyed mode, models mark sub-components with `keyed(obj, pointer)` in their `__ft__`. When
+a state delta or snapshot only touches part of the state, just the affected keyed elements
+are re-rendered and swapped by id instead of the whole `#agui-state` panel:
+
+    class AppState(BaseModel):
+        todos: List[TodoItem] = []
+
+        def __ft__(self):
+            return Div(*[keyed(t, f"/todos/{i}") for i, t in enumerate(self.todos)],
+                       id="agui-state", hx_swap_oob="innerHTML")
+"""
+import copy
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from fasthtml.common import Div, Pre, Safe, to_xml
+from pydantic import BaseModel
+
+from .rendering import active_cache
+
+STATE_ID = "agui-state"
+
+Tokens = Tuple[str, ...]
+
+# Pointers rendered with `keyed()` during the current render, see `collect_keys`
+_rendered_keys: ContextVar[Optional[Set[Tokens]]] = ContextVar('_rendered_keys', default=None)
+
+
+class JsonPatchError(ValueError):
+    """Raised when a JSON Patch operation cannot be applied."""
+
+
+def parse_pointer(pointer: str) -> Tokens:
+    """Split an RFC 6901 JSON Pointer into unescaped reference tokens."""
+    if pointer == "":
+        return ()
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON Pointer: {pointer!r}")
+    return tuple(t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/"))
+
+
+def format_pointer(tokens: Tokens) -> str:
+    return "".join("/" + str(t).replace("~", "~0").replace("/", "~1") for t in tokens)
+
+
+def _index(container: list, token: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise JsonPatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JsonPatchError(f"Array index out of range: {index}")
+    return index
+
+
+def _walk(doc: Any, tokens: Tokens) -> Any:
+    for token in tokens:
+        if isinstance(doc, list):
+            doc = doc[_index(doc, token)]
+        elif isinstance(doc, dict):
+            if token not in doc:
+                raise JsonPatchError(f"Path not found: {format_pointer(tokens)}")
+            doc = doc[token]
+        else:
+            raise JsonPatchError(f"Path not found: {format_pointer(tokens)}")
+    return doc
+
+
+def _add(doc: Any, tokens: Tokens, value: Any) -> Any:
+    if not tokens:
+        return value
+    parent = _walk(doc, tokens[:-1])
+    if isinstance(parent, list):
+        parent.insert(_index(parent, tokens[-1], allow_end=True), value)
+    elif isinstance(parent, dict):
+        parent[tokens[-1]] = value
+    else:
+        raise JsonPatchError(f"Cannot add to {format_pointer(tokens[:-1])}")
+    return doc
+
+
+def _remove(doc: Any, tokens: Tokens) -> Tuple[Any, Any]:
+    if not tokens:
+        raise JsonPatchError("Cannot remove the document root")
+    parent = _walk(doc, tokens[:-1])
+    if isinstance(parent, list):
+        return doc, parent.pop(_index(parent, tokens[-1]))
+    if isinstance(parent, dict) and tokens[-1] in parent:
+        return doc, parent.pop(tokens[-1])
+    raise JsonPatchError(f"Path not found: {format_pointer(tokens)}")
+
+
+def apply_patch(doc: Any, patch: List[Dict[str, Any]], in_place: bool = False) -> Any:
+    """Apply an RFC 6902 JSON Patch to a JSON-compatible document and return the result.
+
+    The document is copied first unless `in_place` is set, in which case it may be left
+    partially patched if an operation fails.
+    """
+    if not in_place:
+        doc = copy.deepcopy(doc)
+    for op in patch:
+        try:
+            name, tokens = op["op"], parse_pointer(op["path"])
+        except KeyError as e:
+            raise JsonPatchError(f"Missing {e.args[0]!r} in patch operation {op!r}") from None
+        if name == "add":
+            doc = _add(doc, tokens, copy.deepcopy(op["value"]))
+        elif name == "remove":
+            doc, _ = _remove(doc, tokens)
+        elif name == "replace":
+            if tokens:
+                doc, _ = _remove(doc, tokens)
+            doc = _add(doc, tokens, copy.deepcopy(op["value"]))
+        elif name == "move":
+            source = parse_pointer(op["from"])
+            if tokens[:len(source)] == source and tokens != source:
+                raise JsonPatchError("Cannot move a value into one of its children")
+            doc, value = _remove(doc, source)
+            doc = _add(doc, tokens, value)
+        elif name == "copy":
+            doc = _add(doc, tokens, copy.deepcopy(_walk(doc, parse_pointer(op["from"]))))
+        elif name == "test":
+            if _walk(doc, tokens) != op["value"]:
+                raise JsonPatchError(f"Test failed at {op['path']}")
+        else:
+            raise JsonPatchError(f"Unknown patch operation: {name!r}")
+    return doc
+
+
+def diff(old: Any, new: Any, _tokens: Tokens = ()) -> List[Dict[str, Any]]:
+    """A JSON Patch turning `old` into `new`.
+
+    Lists are compared index by index with items added or removed at the tail, which is
+    what appending to or popping from a list produces.
+    """
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = [{"op": "remove", "path": format_pointer(_tokens + (k,))}
+               for k in old if k not in new]
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": format_pointer(_tokens + (key,)), "value": value})
+            else:
+                ops += diff(old[key], value, _tokens + (key,))
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        for i in range(min(len(old), len(new))):
+            ops += diff(old[i], new[i], _tokens + (str(i),))
+        for i in range(len(old) - 1, len(new) - 1, -1):
+            ops.append({"op": "remove", "path": format_pointer(_tokens + (str(i),))})
+        for i in range(len(old), len(new)):
+            ops.append({"op": "add", "path": format_pointer(_tokens + (str(i),)), "value": new[i]})
+        return ops
+    return [{"op": "replace", "path": format_pointer(_tokens), "value": new}]
+
+
+def state_key(pointer: str | Tokens) -> str:
+    """DOM id of the keyed element rendering the state value at `pointer`."""
+    tokens = parse_pointer(pointer) if isinstance(pointer, str) else pointer
+    escaped = (re.sub(r'[^A-Za-z0-9_]', lambda m: f"_{ord(m.group()):x}_", t) for t in tokens)
+    return "-".join((STATE_ID, *escaped))
+
+
+def _keyed_ft(obj: Any, tokens: Tokens):
+    el = obj.__ft__() if hasattr(obj, '__ft__') else Div(str(obj))
+    el.attrs['id'] = state_key(tokens)
+    rendered = _rendered_keys.get()
+    if rendered is not None:
+        rendered.add(tokens)
+    return el
+
+
+def keyed(obj: Any, pointer: str):
+    """Render `obj` as the element for the state value at `pointer`.
+
+    The element's id is replaced with `state_key(pointer)`, so keyed state rendering can
+    swap it on its own when only that part of the state changes. Models are rendered
+    through the active `RenderCache`, if any.
+    """
+    tokens = parse_pointer(pointer)
+    cache = active_cache()
+    if cache is None or not isinstance(obj, BaseModel) or not hasattr(obj, '__ft__'):
+        return _keyed_ft(obj, tokens)
+    key = cache.key(obj, tokens)
+    entry = cache.get(key)
+    if entry is None:
+        # Remember the keyed elements nested inside, as a cache hit won't render them
+        with collect_keys() as nested:
+            html = Safe(to_xml(_keyed_ft(obj, tokens), indent=False))
+        cache.put(key, html, frozenset(nested))
+    else:
+        html, nested = entry
+    rendered = _rendered_keys.get()
+    if rendered is not None:
+        rendered.update(nested)
+    return html
+
+
+@contextmanager
+def collect_keys() -> Iterator[Set[Tokens]]:
+    """Collect the pointers passed to `keyed()` while rendering inside the block."""
+    keys: Set[Tokens] = set()
+    token = _rendered_keys.set(keys)
+    try:
+        yield keys
+    finally:
+        _rendered_keys.reset(token)
+
+
+def resolve(obj: Any, tokens: Tokens) -> Any:
+    """Look up `tokens` on a model tree (attributes, list indexes and dict keys)."""
+    for token in tokens:
+        if isinstance(obj, BaseModel):
+            obj = getattr(obj, token)
+        elif isinstance(obj, (list, tuple)):
+            obj = obj[int(token)]
+        else:
+            obj = obj[token]
+    return obj
+
+
+def render_state(state: Any):
+    """The full `#agui-state` panel for `state`."""
+    if hasattr(state, '__ft__'):
+        return state.__ft__()
+    return Div(Pre(str(state)), id=STATE_ID, hx_swap_oob="innerHTML")
+
+
+class KeyedState:
+    """Tracks the keyed elements currently rendered for one thread's state panel."""
+
+    def __init__(self):
+        self.keys: Set[Tokens] = set()
+
+    def render(self, state: Any):
+        """Render the whole panel, recording which keyed elements it contains."""
+        with collect_keys() as keys:
+            el = render_state(state)
+        self.keys = keys
+        return el
+
+    def _owner(self, tokens: Tokens) -> Optional[Tokens]:
+        """The deepest keyed element containing `tokens`."""
+        for n in range(len(tokens), 0, -1):
+            if tokens[:n] in self.keys:
+                return tokens[:n]
+        return None
+
+    def _forget(self, prefix: Tokens):
+        self.keys = {k for k in self.keys if k[:len(prefix)] != prefix}
+
+    def _keyed(self, state: Any, tokens: Tokens, **attrs):
+        with collect_keys() as keys:
+            el = _keyed_ft(resolve(state, tokens), tokens)
+        self.keys |= keys
+        el.attrs.update(attrs)
+        return el
+
+    def render_patch(self, state: Any, patch: List[Dict[str, Any]]) -> Optional[list]:
+        """OOB elements updating the panel for `patch`, already applied to `state`.
+
+        `patch` must be index-stable, as produced by `diff`. Returns None when a change is
+        not covered by any keyed element and the whole panel has to be re-rendered.
+        """
+        rerender: Set[Tokens] = set()
+        appends: Dict[Tokens, List[int]] = {}
+        removes: List[Tokens] = []
+        for op in patch:
+            tokens = parse_pointer(op["path"])
+            parent = tokens[:-1]
+            in_list = (bool(tokens) and tokens[-1].isdigit()
+                       and isinstance(resolve(state, parent), list))
+            if op["op"] == "add" and in_list:
+                index = int(tokens[-1])
+                if (parent + (str(index - 1),) in self.keys
+                        or index - 1 in appends.get(parent, ())):
+                    appends.setdefault(parent, []).append(index)
+                    continue
+            if op["op"] == "remove" and in_list and tokens in self.keys:
+                removes.append(tokens)
+                continue
+            owner = self._owner(tokens if op["op"] == "replace" else parent)
+            if owner is None:
+                return None
+            rerender.add(owner)
+
+        # Skip anything inside an element that is re-rendered anyway
+        def covered(tokens: Tokens) -> bool:
+            return any(tokens[:len(r)] == r for r in rerender if r != tokens)
+        rerender = {r for r in rerender if not covered(r)}
+
+        elements = []
+        for tokens in sorted(rerender):
+            self._forget(tokens)
+            elements.append(self._keyed(state, tokens, **{'hx-swap-oob': 'outerHTML'}))
+        for tokens in removes:
+            if not covered(tokens):
+                self._forget(tokens)
+                elements.append(Div(id=state_key(tokens), hx_swap_oob="delete"))
+        for parent, indexes in appends.items():
+            indexes = [i for i in sorted(indexes) if not covered(parent + (str(i),))]
+            if indexes:
+                items = [self._keyed(state, parent + (str(i),)) for i in indexes]
+                anchor = state_key(parent + (str(indexes[0] - 1),))
+                elements.append(Div(*items, id=anchor, hx_swap_oob="afterend"))
+        return elements
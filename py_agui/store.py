@@ -0,0 +1,199 @@
+"""Pluggable thread persistence: in-memory and SQLite stores for messages and state."""
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from ag_ui.core.types import BaseMessage, Message
+from pydantic import BaseModel, TypeAdapter
+
+_message_adapter = TypeAdapter(Message)
+
+
+@dataclass
+class ThreadRecord:
+    """Persisted contents of a thread, used to hydrate an `AGUIThread`."""
+    messages: List[BaseMessage] = field(default_factory=list)
+    state: Any = None
+    thinking_steps: List[dict] = field(default_factory=list)
+    # Server-rendered Markdown by message id: (content digest, HTML)
+    rendered: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    # Rolling history summary: (text, number of leading messages it covers)
+    summary: Optional[Tuple[str, int]] = None
+
+
+class ThreadStore:
+    """Interface for thread persistence.
+
+    Writes are incremental: one call per new message, state snapshot, thinking step,
+    rendered message or history summary, never a dump of the whole thread. `load` returns
+    None for unknown threads.
+    """
+
+    def load(self, thread_id: str) -> Optional[ThreadRecord]:
+        raise NotImplementedError
+
+    def append_message(self, thread_id: str, message: BaseMessage):
+        raise NotImplementedError
+
+    def save_state(self, thread_id: str, state: Any):
+        raise NotImplementedError
+
+    def append_thinking_step(self, thread_id: str, step: dict):
+        raise NotImplementedError
+
+    def save_rendered(self, thread_id: str, message_id: str, digest: str, html: str):
+        """Keep the rendered HTML of a message; stores that don't simply re-render on load."""
+        pass
+
+    def save_summary(self, thread_id: str, text: str, upto: int):
+        """Keep the rolling history summary covering the first `upto` messages; stores that
+        don't have it rebuilt on load."""
+        pass
+
+    def delete(self, thread_id: str):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InMemoryThreadStore(ThreadStore):
+    """Default store: keeps records in a dict for the lifetime of the process."""
+
+    def __init__(self):
+        self._records: Dict[str, ThreadRecord] = {}
+
+    def _record(self, thread_id: str) -> ThreadRecord:
+        record = self._records.get(thread_id)
+        if record is None:
+            record = self._records[thread_id] = ThreadRecord()
+        return record
+
+    def load(self, thread_id: str) -> Optional[ThreadRecord]:
+        record = self._records.get(thread_id)
+        if record is None:
+            return None
+        return ThreadRecord(list(record.messages), record.state, list(record.thinking_steps),
+                            dict(record.rendered), record.summary)
+
+    def append_message(self, thread_id: str, message: BaseMessage):
+        self._record(thread_id).messages.append(message)
+
+    def save_state(self, thread_id: str, state: Any):
+        self._record(thread_id).state = state
+
+    def append_thinking_step(self, thread_id: str, step: dict):
+        self._record(thread_id).thinking_steps.append(step)
+
+    def save_rendered(self, thread_id: str, message_id: str, digest: str, html: str):
+        self._record(thread_id).rendered[message_id] = (digest, html)
+
+    def save_summary(self, thread_id: str, text: str, upto: int):
+        self._record(thread_id).summary = (text, upto)
+
+    def delete(self, thread_id: str):
+        self._records.pop(thread_id, None)
+
+
+class SQLiteThreadStore(ThreadStore):
+    """SQLite store in WAL mode with one row per message and thinking step.
+
+    State is stored as JSON and returned as a dict on `load`; the caller validates it
+    back into its state model. Writes are small single-row statements, so they are
+    issued synchronously from the event loop.
+    """
+
+    def __init__(self, path: str = "agui.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS agui_messages (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                thread_id TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS agui_messages_thread ON agui_messages (thread_id, seq);
+            CREATE TABLE IF NOT EXISTS agui_thinking_steps (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                thread_id TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS agui_thinking_steps_thread
+                ON agui_thinking_steps (thread_id, seq);
+            CREATE TABLE IF NOT EXISTS agui_states (
+                thread_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS agui_rendered (
+                thread_id TEXT NOT NULL,
+                message_id TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                html TEXT NOT NULL,
+                PRIMARY KEY (thread_id, message_id)
+            );
+            CREATE TABLE IF NOT EXISTS agui_summaries (
+                thread_id TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                upto INTEGER NOT NULL
+            );
+        """)
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def load(self, thread_id: str) -> Optional[ThreadRecord]:
+        messages = self._execute(
+            "SELECT data FROM agui_messages WHERE thread_id = ? ORDER BY seq", (thread_id,))
+        steps = self._execute(
+            "SELECT data FROM agui_thinking_steps WHERE thread_id = ? ORDER BY seq", (thread_id,))
+        state = self._execute("SELECT data FROM agui_states WHERE thread_id = ?", (thread_id,))
+        if not (messages or steps or state):
+            return None
+        rendered = self._execute(
+            "SELECT message_id, digest, html FROM agui_rendered WHERE thread_id = ?", (thread_id,))
+        summary = self._execute(
+            "SELECT text, upto FROM agui_summaries WHERE thread_id = ?", (thread_id,))
+        return ThreadRecord(
+            messages=[_message_adapter.validate_json(data) for data, in messages],
+            state=json.loads(state[0][0]) if state else None,
+            thinking_steps=[json.loads(data) for data, in steps],
+            rendered={message_id: (digest, html) for message_id, digest, html in rendered},
+            summary=summary[0] if summary else None,
+        )
+
+    def append_message(self, thread_id: str, message: BaseMessage):
+        self._execute("INSERT INTO agui_messages (thread_id, data) VALUES (?, ?)",
+                      (thread_id, message.model_dump_json()))
+
+    def save_state(self, thread_id: str, state: Any):
+        data = state.model_dump_json() if isinstance(state, BaseModel) else json.dumps(state)
+        self._execute("INSERT OR REPLACE INTO agui_states (thread_id, data) VALUES (?, ?)",
+                      (thread_id, data))
+
+    def append_thinking_step(self, thread_id: str, step: dict):
+        self._execute("INSERT INTO agui_thinking_steps (thread_id, data) VALUES (?, ?)",
+                      (thread_id, json.dumps(step)))
+
+    def save_rendered(self, thread_id: str, message_id: str, digest: str, html: str):
+        self._execute("INSERT OR REPLACE INTO agui_rendered (thread_id, message_id, digest, html) "
+                      "VALUES (?, ?, ?, ?)", (thread_id, message_id, digest, html))
+
+    def save_summary(self, thread_id: str, text: str, upto: int):
+        self._execute("INSERT OR REPLACE INTO agui_summaries (thread_id, text, upto) "
+                      "VALUES (?, ?, ?)", (thread_id, text, upto))
+
+    def delete(self, thread_id: str):
+        with self._lock:
+            for table in ("agui_messages", "agui_thinking_steps", "agui_states", "agui_rendered",
+                          "agui_summaries"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
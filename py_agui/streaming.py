@@ -0,0 +1,303 @@
+"""Outbound streaming helpers: delta coalescing, per-connection write queues, replay and SSE."""
+import asyncio
+import uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Literal, Optional, Tuple
+
+from ag_ui.core.events import BaseEvent, EventType
+from fasthtml.common import Safe, to_xml
+
+# Event types whose `delta` can be concatenated without changing what the client renders
+COALESCIBLE_EVENTS = {EventType.TEXT_MESSAGE_CONTENT}
+if hasattr(EventType, 'REASONING_MESSAGE_CONTENT'):
+    COALESCIBLE_EVENTS.add(EventType.REASONING_MESSAGE_CONTENT)
+
+
+class DeltaCoalescer:
+    """Merges consecutive content deltas for the same message into a single event.
+
+    Buffered deltas are flushed when `flush_interval_ms` has passed since the first one
+    was buffered, when the buffer reaches `max_bytes`, or when an event of any other
+    type or message arrives. A `flush_interval_ms` of 0 disables coalescing.
+
+    Nothing awaits the interval flush, so if emitting from it fails the error is raised
+    from the next `push` or `flush` instead, failing the run that owns the coalescer.
+    """
+
+    def __init__(self,
+                 emit: Callable[[BaseEvent], Awaitable[None]],
+                 flush_interval_ms: float = 50,
+                 max_bytes: int = 4096):
+        self._emit = emit
+        self.flush_interval_ms = flush_interval_ms
+        self.max_bytes = max_bytes
+        self._first: Optional[BaseEvent] = None
+        self._deltas: List[str] = []
+        self._size = 0
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._error: Optional[Exception] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_interval_ms > 0
+
+    async def push(self, event: BaseEvent):
+        """Buffer `event` if it can be merged, otherwise flush and emit it."""
+        self._raise_timer_error()
+        if not self.enabled or event.type not in COALESCIBLE_EVENTS:
+            await self.flush()
+            await self._emit(event)
+            return
+
+        first = self._first
+        if first is not None and (first.type, first.message_id) != (event.type, event.message_id):
+            await self.flush()
+        if self._first is None:
+            self._first = event
+            self._timer = asyncio.create_task(self._flush_later())
+        self._deltas.append(event.delta)
+        self._size += len(event.delta.encode())
+        if self._size >= self.max_bytes:
+            await self.flush()
+
+    async def flush(self):
+        """Emit everything buffered so far as one merged event."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        async with self._lock:
+            if self._first is not None:
+                event = self._first.model_copy(update={'delta': ''.join(self._deltas)})
+                self._first, self._deltas, self._size = None, [], 0
+                await self._emit(event)
+        # Also catches an interval flush that failed while this one waited for the lock
+        self._raise_timer_error()
+
+    def _raise_timer_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval_ms / 1000)
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            self._error = e
+
+
+class Payload(Safe):
+    """HTML rendered once up front so the same frame can be written to many connections.
+
+    FastHTML's `send` passes strings through `to_xml` unchanged, so a `Payload` is only
+    serialized by `render`, however many sockets it is written to.
+    """
+
+    # Replay cursor of the frame, when its thread numbers frames
+    cursor: Optional[str] = None
+    # Frames a coalescing writer merged into this one
+    frames: int = 1
+
+    @classmethod
+    def render(cls, *elements) -> 'Payload':
+        return cls(''.join(to_xml(e, indent=False) for e in elements))
+
+    @classmethod
+    def numbered(cls, html: str, cursor: Optional[str], frames: int = 1) -> 'Payload':
+        payload = cls(html)
+        payload.cursor, payload.frames = cursor, frames
+        return payload
+
+
+def _successor(cursor: str) -> Optional[str]:
+    """The cursor numbered right after `cursor`."""
+    epoch, _, seq = cursor.rpartition(":")
+    return f"{epoch}:{int(seq) + 1}" if seq.isdigit() else None
+
+
+OverflowPolicy = Literal['drop-oldest', 'coalesce', 'disconnect']
+
+
+class ConnectionWriter:
+    """Bounded outbound queue drained by a dedicated writer task for one connection.
+
+    When the queue is full, `policy` decides what happens: `drop-oldest` discards the
+    oldest queued frame, `coalesce` merges all queued frames into a single frame, and
+    `disconnect` closes the connection.
+
+    With `marker`, a function rendering the replay cursor marker, numbered frames get the
+    marker of their cursor appended only where the client can't count it: on the first
+    frame, after a gap or an epoch change, and on merged frames. The client numbers every
+    other frame one after the previous.
+    """
+
+    def __init__(self,
+                 send: Callable[[Any], Awaitable[None]],
+                 close: Optional[Callable[[], Awaitable[None]]] = None,
+                 max_queue: int = 256,
+                 policy: OverflowPolicy = 'coalesce',
+                 marker: Optional[Callable[[str], str]] = None):
+        self._send = send
+        self._close = close
+        self.max_queue = max_queue
+        self.policy = policy
+        self._marker = marker
+        # Cursor of the last numbered frame sent, as the client last counted it
+        self._cursor: Optional[str] = None
+        self._queue: Deque[Any] = deque()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def put(self, item: Any) -> bool:
+        """Queue `item` for sending. Returns False if the connection is closed."""
+        if self.closed:
+            return False
+        if len(self._queue) >= self.max_queue:
+            if self.policy == 'disconnect':
+                self.stop(close=True)
+                return False
+            if self.policy == 'coalesce':
+                self.coalesced += len(self._queue) - 1
+                cursor = next((i.cursor for i in reversed(self._queue)
+                               if getattr(i, 'cursor', None) is not None), None)
+                merged = Payload.numbered(''.join(to_xml(i) for i in self._queue), cursor,
+                                          sum(getattr(i, 'frames', 1) for i in self._queue))
+                self._queue.clear()
+                self._queue.append(merged)
+            else:
+                self._queue.popleft()
+                self.dropped += 1
+        self._queue.append(item)
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._ready.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return True
+
+    def stop(self, close: bool = False):
+        """Stop the writer task, dropping anything still queued."""
+        self.closed = True
+        self._queue.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if close and self._close is not None:
+            asyncio.ensure_future(self._close())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+        }
+
+    def _mark(self, item: Any) -> Any:
+        cursor = getattr(item, 'cursor', None)
+        if self._marker is None or cursor is None:
+            return item
+        counted = (self._cursor is not None and item.frames == 1
+                   and cursor == _successor(self._cursor))
+        self._cursor = cursor
+        if counted:
+            return item
+        return Payload.numbered(item + self._marker(cursor), cursor, item.frames)
+
+    async def _run(self):
+        while True:
+            while not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+            item = self._mark(self._queue.popleft())
+            try:
+                await self._send(item)
+            except Exception:
+                self.closed = True
+                self._queue.clear()
+                return
+            self.sent += 1
+
+
+class ReplayBuffer:
+    """The last `maxlen` frames sent to a thread, numbered with a monotonic sequence.
+
+    A client remembers the cursor of the last frame it received (`epoch:seq`) and sends it
+    when it reconnects. The epoch is random per buffer, so cursors from before a restart,
+    or from another worker, never match.
+    """
+
+    def __init__(self, maxlen: int = 256):
+        self.maxlen = maxlen
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        # Total length of the buffered frames
+        self.nbytes = 0
+        self._frames: Deque[Tuple[int, Payload]] = deque(maxlen=maxlen)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def cursor(self) -> str:
+        return self.cursor_at(self.seq)
+
+    def cursor_at(self, seq: int) -> str:
+        return f"{self.epoch}:{seq}"
+
+    def next_cursor(self) -> str:
+        """Cursor of the frame `append` will number next."""
+        return self.cursor_at(self.seq + 1)
+
+    def append(self, payload: Payload) -> int:
+        """Number and keep `payload`, dropping the oldest frame when full.
+
+        Returns the change in `nbytes`.
+        """
+        dropped = len(self._frames[0][1]) if len(self._frames) == self.maxlen else 0
+        self.seq += 1
+        self._frames.append((self.seq, payload))
+        self.nbytes += len(payload) - dropped
+        return len(payload) - dropped
+
+    def clear(self) -> int:
+        """Drop every buffered frame but keep numbering from the same cursor.
+
+        Returns the bytes released. Clients behind the cursor then resume from a snapshot.
+        """
+        released, self.nbytes = self.nbytes, 0
+        self._frames.clear()
+        return released
+
+    def since(self, cursor: str) -> Optional[List[Payload]]:
+        """Frames sent after `cursor`, or None when some of them are no longer buffered."""
+        epoch, _, seq = cursor.partition(":")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self.seq:
+            return None
+        last = int(seq)
+        if last == self.seq:
+            return []
+        if not self._frames or self._frames[0][0] > last + 1:
+            return None
+        return [payload for n, payload in self._frames if n > last]
+
+
+def sse_event(data: str, id: Optional[str] = None, event: Optional[str] = None) -> str:
+    """Format one Server-Sent Event, splitting multi-line `data` over several fields."""
+    lines = [f"id: {id}"] if id is not None else []
+    if event is not None:
+        lines.append(f"event: {event}")
+    data = data.replace("\r\n", "\n").replace("\r", "\n")
+    lines += [f"data: {line}" for line in data.split("\n")]
+    return "\n".join(lines) + "\n\n"
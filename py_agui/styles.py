@@ -1,4 +1,5 @@
 """Modern chat UI styles with 3-pane layout support and thinking trace"""
+from .assets import register_asset
 
 CHAT_UI_STYLES = """
 /* === CSS Custom Properties === */
@@ -205,6 +206,13 @@ body { margin: 0; font-family: var(--chat-font-family); background: var(--chat-b
   font-size: 0.95rem;
 }
 
+.chat-history-sentinel {
+  color: var(--chat-text-muted);
+  text-align: center;
+  font-size: 0.8rem;
+  padding: 0.5rem 0;
+}
+
 /* === Message Styles === */
 .chat-message {
   display: flex;
@@ -313,6 +321,21 @@ body { margin: 0; font-family: var(--chat-font-family); background: var(--chat-b
   font-size: 0.8rem;
   text-align: center;
 }
+.chat-stop-button {
+  margin-left: 0.5rem;
+  padding: 0.1rem 0.6rem;
+  background: transparent;
+  color: var(--chat-text-muted);
+  border: 1px solid var(--chat-border);
+  border-radius: var(--chat-border-radius);
+  font-family: var(--chat-font-family);
+  font-size: 0.75rem;
+  cursor: pointer;
+}
+
+.chat-stop-button:hover {
+  color: var(--chat-text);
+}
 
 /* Suggestion Buttons */
 #suggestion-buttons {
@@ -597,8 +620,26 @@ def get_chat_styles():
 
 def get_custom_theme(**theme_vars):
     from fasthtml.common import Style
+    return Style(_custom_theme_css(**theme_vars))
+
+
+def chat_styles_link():
+    """Link to the chat styles, served by AGUISetup as a cached, content-hashed asset."""
+    from fasthtml.common import Link
+    asset = register_asset("agui-styles", CHAT_UI_STYLES, "text/css")
+    return Link(rel="stylesheet", href=asset.url)
+
+
+def custom_theme_link(**theme_vars):
+    """Like get_custom_theme(), but emits a link to a cached, content-hashed asset."""
+    from fasthtml.common import Link
+    css = _custom_theme_css(**theme_vars)
+    return Link(rel="stylesheet", href=register_asset("agui-theme", css, "text/css").url)
+
+
+def _custom_theme_css(**theme_vars):
     css_vars = []
     for key, value in theme_vars.items():
         css_var = f"--{key.replace('_', '-')}: {value};"
         css_vars.append(css_var)
-    return Style(f":root {{ {' '.join(css_vars)} }}")
+    return f":root {{ {' '.join(css_vars)} }}"
@@ -0,0 +1,52 @@
+import asyncio
+from typing import Callable, Dict, Optional, Tuple
+
+import pytest
+
+
+async def _request(app, method: str, path: str, body: bytes = b"",
+                   headers: Optional[Dict[str, str]] = None,
+                   stop: Optional[Callable[[bytes], bool]] = None) -> Tuple[int, dict, bytes]:
+    """Send one HTTP request straight through the ASGI `app`.
+
+    Returns the status, the response headers and the body. For streams that don't end on
+    their own, the client disconnects once `stop(body so far)` is true.
+    """
+    path, _, query = path.partition('?')
+    headers = {**(headers or {}), 'content-length': str(len(body))}
+    if body:
+        headers.setdefault('content-type', 'application/x-www-form-urlencoded')
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+             'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+             'query_string': query.encode(), 'root_path': '', 'server': ('test', 80),
+             'client': ('test', 1234),
+             'headers': [(k.lower().encode(), v.encode()) for k, v in headers.items()]}
+    disconnected = asyncio.Event()
+    sent_body = False
+    response = {'status': None, 'headers': {}, 'body': b""}
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = {k.decode(): v.decode() for k, v in message['headers']}
+        elif message['type'] == 'http.response.body':
+            response['body'] += message.get('body', b"")
+            if stop is not None and stop(response['body']):
+                disconnected.set()
+
+    await asyncio.wait_for(app(scope, receive, send), 5)
+    return response['status'], response['headers'], response['body']
+
+
+@pytest.fixture
+def request_app():
+    """`await request_app(app, method, path, ...)` sends one request; see `_request`."""
+    return _request
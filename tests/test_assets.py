@@ -0,0 +1,74 @@
+import gzip
+
+from fasthtml.common import fast_app
+from pydantic_ai import Agent
+from pydantic_ai.models.test import TestModel
+from starlette.requests import Request
+
+from py_agui import setup_agui
+from py_agui.assets import ASSET_PREFIX, CACHE_CONTROL, Asset, asset_response, register_asset
+from py_agui.scripts import chat_script_tag
+from py_agui.styles import chat_styles_link, custom_theme_link
+
+
+def _request(**headers) -> Request:
+    return Request({'type': 'http', 'method': 'GET', 'path': '/', 'query_string': b'',
+                    'headers': [(k.replace('_', '-').encode(), v.encode())
+                                for k, v in headers.items()]})
+
+
+def _asset() -> Asset:
+    return Asset(name="test", content=b"body {}", media_type="text/css", digest="abc123",
+                 encoded={'br': b"brotli", 'gzip': b"gzipped"})
+
+
+def test_urls_are_content_hashed():
+    asset = register_asset("test-hashed", "a {}", "text/css")
+    assert register_asset("test-hashed", "a {}", "text/css") is asset
+    changed = register_asset("test-hashed", "b {}", "text/css")
+    assert asset.url.startswith(ASSET_PREFIX + "/test-hashed-") and changed.url != asset.url
+    assert gzip.decompress(asset.encoded['gzip']) == b"a {}"
+    assert custom_theme_link(primary="red").href != custom_theme_link(primary="blue").href
+    assert chat_script_tag().src.startswith(ASSET_PREFIX + "/agui-chat-")
+
+
+def test_picks_brotli_then_gzip_then_identity():
+    asset = _asset()
+    for accept, encoding, body in [("gzip, deflate, br", "br", b"brotli"),
+                                   ("gzip, br;q=0", "gzip", b"gzipped"),
+                                   ("", None, b"body {}"),
+                                   ("identity, gzip;q=0.0", None, b"body {}")]:
+        response = asset_response(asset, _request(accept_encoding=accept))
+        assert response.status_code == 200 and response.body == body
+        assert response.headers.get("content-encoding") == encoding
+        assert response.headers["etag"] == asset.etag(encoding)
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["cache-control"] == CACHE_CONTROL
+        assert response.headers["content-type"].startswith("text/css")
+
+
+def test_matching_etag_gets_304():
+    asset = _asset()
+    response = asset_response(asset, _request(accept_encoding="gzip",
+                                              if_none_match=f'"other", {asset.etag("gzip")}'))
+    assert response.status_code == 304 and response.body == b""
+    assert response.headers["cache-control"] == CACHE_CONTROL
+    # The tag of another encoding doesn't match
+    response = asset_response(asset, _request(accept_encoding="gzip",
+                                              if_none_match=asset.etag("br")))
+    assert response.status_code == 200
+
+
+async def test_setup_serves_registered_assets(request_app):
+    app, _ = fast_app(exts='ws', secret_key="test")
+    setup_agui(app, Agent(TestModel()))
+    url = chat_styles_link().href
+    status, headers, body = await request_app(app, 'GET', url, headers={'Accept-Encoding': 'gzip'})
+    assert status == 200 and headers["content-encoding"] == "gzip"
+    assert headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert b".chat-container" in gzip.decompress(body)
+    status, _, _ = await request_app(app, 'GET', url, headers={'Accept-Encoding': 'gzip',
+                                                               'If-None-Match': headers["etag"]})
+    assert status == 304
+    status, _, _ = await request_app(app, 'GET', ASSET_PREFIX + "/unknown-0000")
+    assert status == 404
@@ -0,0 +1,87 @@
+import asyncio
+from types import SimpleNamespace
+
+from fasthtml.common import Div, fast_app
+from pydantic import BaseModel
+from pydantic_ai import Agent
+from pydantic_ai.models.test import TestModel
+
+from py_agui import InMemoryRedis, InMemoryThreadStore, RedisBackplane, setup_agui
+
+
+class Counter(BaseModel):
+    count: int = 0
+
+
+def _worker(redis, store, backplane=None):
+    """A setup standing in for one worker process, sharing `redis` and `store` with others."""
+    app, _ = fast_app(exts='ws', secret_key="test")
+    backplane = backplane if backplane is not None else RedisBackplane(redis)
+    return setup_agui(app, Agent(TestModel()), initial_state=Counter(), store=store,
+                      backplane=backplane)
+
+
+async def _until(predicate):
+    for _ in range(100):
+        if predicate():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("timed out")
+
+
+async def test_frames_reach_connections_on_other_workers():
+    redis, store = InMemoryRedis(), InMemoryThreadStore()
+    first, second = _worker(redis, store), _worker(redis, store)
+    received = []
+
+    async def send(item):
+        received.append(str(item))
+    ws = SimpleNamespace(scope={}, query_params={}, close=None)
+    await first._on_conn(ws, send, {}, "main")
+    await asyncio.sleep(0)  # the pub/sub subscription is made in a task
+
+    await second.thread("main").send(Div("from the other worker"))
+    await _until(lambda: received)
+    assert "from the other worker" in received[0]
+    await first._on_disconn(ws)
+    await first.backplane.close()
+    await second.backplane.close()
+
+
+async def test_changes_reload_every_setup_and_keep_unsaved_edits():
+    redis, store = InMemoryRedis(), InMemoryThreadStore()
+    shared = RedisBackplane(redis)
+    first, also_first, second = (_worker(redis, store, shared), _worker(redis, store, shared),
+                                 _worker(redis, store))
+    assert shared._on_change == [first._thread_changed, also_first._thread_changed]
+
+    # An idle cached thread with an unsaved in-place edit, and one in the other setup
+    first.thread("main").state.count = 1
+    also_first.thread("other")
+    await asyncio.sleep(0)
+
+    second.thread("main").state = Counter(count=2)
+    second.thread("other").state = Counter(count=3)
+    await _until(lambda: "main" not in first._threads and "other" not in also_first._threads)
+    # The edit was saved before the cached copy was dropped
+    assert store.load("main").state == Counter(count=1)
+    assert also_first.thread("other").state.count == 3
+    for backplane in (shared, second.backplane):
+        await backplane.close()
+
+
+async def test_thread_in_use_is_reloaded_in_place():
+    redis, store = InMemoryRedis(), InMemoryThreadStore()
+    first, second = _worker(redis, store), _worker(redis, store)
+    thread = first.thread("main")
+
+    async def send(item):
+        pass
+    thread.subscribe("tab", send)
+    await asyncio.sleep(0)
+    second.thread("main").state = Counter(count=4)
+    await _until(lambda: thread._state.count == 4)
+    assert first.thread("main") is thread
+    thread.unsubscribe("tab")
+    await first.backplane.close()
+    await second.backplane.close()
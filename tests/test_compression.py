@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from fasthtml.common import fast_app
+from pydantic_ai import Agent
+from pydantic_ai.models.test import TestModel
+
+from py_agui import WSCompression, setup_agui
+from py_agui.compression import AGUIWebSocketProtocol, ThresholdPerMessageDeflate
+
+pytestmark = pytest.mark.skipif(AGUIWebSocketProtocol is None, reason="needs uvicorn")
+
+HANDSHAKE = (b"GET /agui/ws/main HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+             b"Connection: Upgrade\r\nSec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+             b"Sec-WebSocket-Version: 13\r\n"
+             b"Sec-WebSocket-Extensions: permessage-deflate; client_max_window_bits\r\n\r\n")
+
+
+def _negotiate(protocol):
+    from uvicorn.config import Config
+    from uvicorn.server import ServerState
+    config = Config(app=None, log_level="warning")
+    loop = asyncio.new_event_loop()
+    try:
+        conn = protocol(config=config, server_state=ServerState(), app_state={}, _loop=loop).conn
+    finally:
+        loop.close()
+    conn.receive_data(HANDSHAKE)
+    response = conn.accept(conn.events_received()[0])
+    return response.headers.get("Sec-WebSocket-Extensions"), conn.extensions
+
+
+def _setup(**options):
+    app, _ = fast_app(exts='ws', secret_key="test")
+    return setup_agui(app, Agent(TestModel()), **options)
+
+
+def test_setups_keep_their_own_compression():
+    small = _setup(ws_compression=WSCompression(window_bits=9, min_size=64))
+    large = _setup(ws_compression=WSCompression(window_bits=15))
+    assert small.ws_protocol.compression.window_bits == 9
+    assert large.ws_protocol.compression.window_bits == 15
+    assert AGUIWebSocketProtocol.compression is None
+
+    header, (ext,) = _negotiate(small.ws_protocol)
+    assert "server_max_window_bits=9" in header
+    assert isinstance(ext, ThresholdPerMessageDeflate) and ext.min_size == 64
+    header, _ = _negotiate(large.ws_protocol)
+    assert "server_max_window_bits=15" in header
+
+
+def test_disabled_and_default_protocols():
+    header, extensions = _negotiate(_setup(ws_compression=WSCompression(enabled=False))
+                                    .ws_protocol)
+    assert header is None and extensions == []
+    assert _setup().ws_protocol is AGUIWebSocketProtocol
@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+
+from fasthtml.common import Div, fast_app
+from pydantic_ai import Agent
+from pydantic_ai.models.test import TestModel
+
+from py_agui import setup_agui
+from py_agui.connections import ConnectionRegistry, connection_id
+
+
+def _ws():
+    async def close():
+        ws.closed = True
+    ws = SimpleNamespace(scope={}, query_params={}, close=close, closed=False)
+    return ws
+
+
+def test_registry_indexes_by_thread_and_session():
+    registry = ConnectionRegistry()
+    ws = _ws()
+    a = registry.add("main", "s1", ws)
+    b = registry.add("main", "s2")
+    c = registry.add("other", "s1")
+    assert len(registry) == 3 and a.id in registry
+    assert connection_id(ws) == a.id and registry.get(a.id) is a
+    assert {conn.id for conn in registry.for_thread("main")} == {a.id, b.id}
+    assert {conn.id for conn in registry.for_session("s1")} == {a.id, c.id}
+    assert registry.threads("s1") == {"main", "other"}
+
+    assert registry.remove(a.id) is a
+    assert registry.remove(a.id) is None and registry.remove(None) is None
+    assert a.id not in registry and registry.get(a.id) is None
+    assert [conn.id for conn in registry.for_thread("main")] == [b.id]
+    assert registry.threads("s1") == {"other"}
+    registry.remove(b.id)
+    registry.remove(c.id)
+    assert len(registry) == 0 and registry.for_thread("main") == []
+    assert registry.threads("s1") == set()
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_broadcast_reaches_only_the_thread_connections():
+    app, _ = fast_app(exts='ws', secret_key="test")
+    agui = setup_agui(app, Agent(TestModel()))
+    received = {name: [] for name in ("first", "second", "elsewhere")}
+    sockets = {name: _ws() for name in received}
+    for name, thread_id in (("first", "main"), ("second", "main"), ("elsewhere", "other")):
+        async def send(item, name=name):
+            received[name].append(str(item))
+        await agui._on_conn(sockets[name], send, {"agui_session_id": "s1"}, thread_id)
+    assert len(agui.connections) == 3
+    assert agui.connections.threads("s1") == {"main", "other"}
+
+    await agui.thread("main").send(Div("hello", id="greeting"))
+    await _settle()
+    assert len(received["first"]) == len(received["second"]) == 1
+    assert "hello" in received["first"][0] and received["elsewhere"] == []
+
+    await agui._on_disconn(sockets["first"])
+    assert connection_id(sockets["first"]) not in agui.connections
+    assert list(agui.thread("main").connection_stats()) == [connection_id(sockets["second"])]
+    await agui.thread("main").send(Div("again"))
+    await _settle()
+    assert len(received["first"]) == 1 and len(received["second"]) == 2
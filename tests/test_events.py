@@ -0,0 +1,57 @@
+import asyncio
+import json
+import time
+
+from fasthtml.common import fast_app
+from pydantic_ai import Agent
+from pydantic_ai.models.test import TestModel
+
+from py_agui import setup_agui
+
+
+def _setup(**options):
+    app, _ = fast_app(exts='ws', secret_key="test")
+    agui = setup_agui(app, Agent(TestModel(custom_output_text="hello there")),
+                      server_side_runs=True, **options)
+    return app, agui
+
+
+def _types(body: bytes):
+    return [json.loads(line)["type"] for line in body.decode().splitlines() if line.strip()]
+
+
+async def test_run_stream_opened_after_send_replays_the_whole_run(request_app):
+    app, agui = _setup()
+    status, headers, _ = await request_app(app, 'POST', '/agui/send/main', b"msg=hi")
+    assert status == 204
+    run_id = headers["x-agui-run-id"]
+
+    # Opened while the run is still starting: nothing emitted so far is missed
+    live = asyncio.create_task(
+        request_app(app, 'GET', f'/agui/events/main?run_id={run_id}&format=jsonl'))
+    await asyncio.gather(*agui.thread("main")._tasks)
+    status, _, body = await live
+    assert status == 200
+    types = _types(body)
+    assert types[:2] == ["RUN_STARTED", "TEXT_MESSAGE_START"]
+    assert types[-1] == "RUN_FINISHED" and "TEXT_MESSAGE_CONTENT" in types
+
+    # Opened after the run ended: the buffered events are replayed and the stream ends
+    status, _, replayed = await request_app(
+        app, 'GET', f'/agui/events/main?run_id={run_id}&format=jsonl')
+    assert status == 200 and _types(replayed) == types
+    text = "".join(json.loads(line).get("delta", "") for line in replayed.decode().splitlines())
+    assert text == "hello there"
+
+
+async def test_finished_run_events_are_released_after_run_ttl(request_app):
+    app, agui = _setup(run_ttl=10)
+    _, headers, _ = await request_app(app, 'POST', '/agui/send/main', b"msg=hi")
+    run_id = headers["x-agui-run-id"]
+    thread = agui.thread("main")
+    await asyncio.gather(*thread._tasks)
+    thread._runs.get(run_id).finished_at = time.monotonic() - 11
+    status, _, _ = await request_app(app, 'GET', f'/agui/events/main?run_id={run_id}')
+    assert status == 404 and thread._runs.get(run_id).events is None
+    status, _, _ = await request_app(app, 'GET', '/agui/events/main?run_id=unknown')
+    assert status == 404
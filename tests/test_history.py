@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+import pytest
+from ag_ui.core.types import AssistantMessage, UserMessage
+
+from py_agui.history import (
+    FullHistory,
+    HistorySummary,
+    LastTurns,
+    RollingSummary,
+    TokenBudget,
+    turn_starts,
+)
+
+
+def _turns(n: int, reply: str = "ok"):
+    messages = []
+    for i in range(n):
+        messages.append(UserMessage(id=f"u{i}", role="user", content=f"question {i}"))
+        messages.append(AssistantMessage(id=f"a{i}", role="assistant", content=reply))
+    return messages
+
+
+def _ids(window):
+    return [m.id for m in window.messages]
+
+
+def test_turn_starts_include_leading_assistant_messages():
+    messages = [AssistantMessage(id="hello", role="assistant", content="hi"), *_turns(2)]
+    assert turn_starts(messages) == [0, 1, 3]
+    assert turn_starts(_turns(2)) == [0, 2]
+
+
+async def test_full_history_and_last_turns():
+    messages = _turns(5)
+    assert len((await FullHistory().select(None, messages)).messages) == 10
+    assert _ids(await LastTurns(2).select(None, messages)) == ["u3", "a3", "u4", "a4"]
+    assert len((await LastTurns(10).select(None, messages)).messages) == 10
+    with pytest.raises(ValueError):
+        LastTurns(0)
+
+
+async def test_token_budget_keeps_whole_recent_turns():
+    messages = _turns(5)
+    # Every message counts 10, so a turn counts 20
+    policy = TokenBudget(max_tokens=50, count_tokens=lambda m: 10)
+    assert _ids(await policy.select(None, messages)) == ["u3", "a3", "u4", "a4"]
+    tiny = TokenBudget(max_tokens=1, count_tokens=lambda m: 10)
+    assert _ids(await tiny.select(None, messages)) == ["u4", "a4"]
+
+
+class _Summarizer:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, previous, messages):
+        self.calls.append((previous, [m.id for m in messages]))
+        return f"{previous or ''}+{len(messages)}"
+
+
+async def test_rolling_summary_folds_turns_out_of_the_window():
+    summarizer = _Summarizer()
+    policy = RollingSummary(summarizer, keep_turns=2, summarize_every=2)
+    thread = SimpleNamespace(history_summary=None)
+
+    window = await policy.select(thread, _turns(3))
+    assert window.summary is None and len(window.messages) == 6
+    assert summarizer.calls == []
+
+    window = await policy.select(thread, _turns(4))
+    assert summarizer.calls == [(None, ["u0", "a0", "u1", "a1"])]
+    assert thread.history_summary == HistorySummary("+4", 4)
+    assert window.summary == "+4" and _ids(window) == ["u2", "a2", "u3", "a3"]
+
+    # A single turn out of the window waits for the next one
+    window = await policy.select(thread, _turns(5))
+    assert len(summarizer.calls) == 1 and _ids(window)[0] == "u2"
+
+    window = await policy.select(thread, _turns(6))
+    assert summarizer.calls[1] == ("+4", ["u2", "a2", "u3", "a3"])
+    assert window.summary == "+4+4" and _ids(window) == ["u4", "a4", "u5", "a5"]
+
+
+async def test_rolling_summary_folds_in_bounded_batches():
+    summarizer = _Summarizer()
+    policy = RollingSummary(summarizer, keep_turns=2, summarize_every=2)
+    thread = SimpleNamespace(history_summary=None)
+
+    window = await policy.select(thread, _turns(3))
+    assert window.summary is None and len(window.messages) == 6
+    assert summarizer.calls == []
+
+    # Five turns fell out of the window: two batches of two, the fifth waits
+    window = await policy.select(thread, _turns(7))
+    assert summarizer.calls == [(None, ["u0", "a0", "u1", "a1"]),
+                                ("+4", ["u2", "a2", "u3", "a3"])]
+    assert thread.history_summary == HistorySummary("+4+4", 8)
+    assert window.summary == "+4+4"
+    assert _ids(window) == ["u4", "a4", "u5", "a5", "u6", "a6"]
+
+    # Reuses the saved summary instead of summarizing again
+    window = await policy.select(thread, _turns(7))
+    assert len(summarizer.calls) == 2 and window.summary == "+4+4"
+
+
+async def test_rolling_summary_discards_summary_past_the_window():
+    summarizer = _Summarizer()
+    policy = RollingSummary(summarizer, keep_turns=2, summarize_every=2)
+    thread = SimpleNamespace(history_summary=HistorySummary("stale", 20))
+    window = await policy.select(thread, _turns(4))
+    assert summarizer.calls == [(None, ["u0", "a0", "u1", "a1"])]
+    assert window.summary == "+4" and thread.history_summary.upto == 4
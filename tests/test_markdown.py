@@ -0,0 +1,71 @@
+import html
+
+import pytest
+from ag_ui.core.types import AssistantMessage
+from fasthtml.common import fast_app
+from pydantic_ai import Agent
+from pydantic_ai.models.test import TestModel
+
+from py_agui import InMemoryThreadStore, setup_agui
+from py_agui.markdown import content_digest, resolve_renderer
+
+
+class _Renderer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text: str) -> str:
+        self.calls.append(text)
+        return f"<p>{html.escape(text)}</p>"
+
+
+def _setup(renderer, store=None):
+    app, _ = fast_app(exts='ws', secret_key="test")
+    return setup_agui(app, Agent(TestModel()), server_markdown=renderer, store=store)
+
+
+def test_resolve_renderer():
+    assert resolve_renderer(False) is None
+    renderer = _Renderer()
+    assert resolve_renderer(renderer) is renderer
+
+
+def test_rendered_html_is_cached_by_content_and_counted_once():
+    renderer = _Renderer()
+    agui = _setup(renderer)
+    thread = agui.thread("main")
+    message = AssistantMessage(id="a1", role="assistant", content="short")
+    thread._add_message(message)
+    base = thread._approx_bytes
+
+    assert str(thread._message_html(message)) == "<p>short</p>"
+    assert str(thread._message_html(message)) == "<p>short</p>"
+    assert renderer.calls == ["short"]
+    assert thread._approx_bytes == base + len("<p>short</p>")
+
+    # An edited message is rendered again and replaces its old HTML in the accounting
+    message.content = "a much longer reply"
+    assert str(thread._message_html(message)) == "<p>a much longer reply</p>"
+    assert thread._approx_bytes == base + len("<p>a much longer reply</p>")
+    assert agui._thread_bytes == thread._approx_bytes
+    assert thread._rendered["a1"][0] == content_digest("a much longer reply")
+
+
+def test_rendered_html_is_persisted_and_reused_after_reload():
+    renderer, store = _Renderer(), InMemoryThreadStore()
+    thread = _setup(renderer, store).thread("main")
+    message = AssistantMessage(id="a1", role="assistant", content="**hi**")
+    thread._add_message(message)
+    thread._message_html(message)
+
+    reloaded = _setup(renderer, store).thread("main")
+    assert str(reloaded._message_html(reloaded._messages[0])) == "<p>**hi**</p>"
+    assert renderer.calls == ["**hi**"]
+    assert reloaded._approx_bytes == thread._approx_bytes
+
+
+@pytest.mark.parametrize("content", [None, [{"type": "text", "text": "hi"}]])
+def test_non_text_content_is_left_to_the_client(content):
+    thread = _setup(_Renderer()).thread("main")
+    message = AssistantMessage.model_construct(id="a1", role="assistant", content=content)
+    assert thread._message_html(message) is None
@@ -0,0 +1,198 @@
+import asyncio
+import time
+
+import pytest
+from ag_ui.core.events import EventType
+from fasthtml.common import fast_app
+from pydantic_ai import Agent
+from pydantic_ai.models.function import FunctionModel
+
+from py_agui import setup_agui
+from py_agui.runs import AdmissionController, RunRegistry, RunStatus
+
+
+def test_pending_runs_expire():
+    runs = RunRegistry(pending_ttl=10)
+    now = time.monotonic()
+    runs.add("old", None).created_at = now - 11
+    runs.add("new", None).created_at = now - 6
+    claimed = runs.add("claimed", None)
+    assert runs.claim("claimed") is claimed and claimed.status == RunStatus.QUEUED
+    claimed.created_at = now - 20
+    assert runs.active == 2
+    assert "old" not in runs and runs.get("old").status == RunStatus.EXPIRED
+    assert runs.claim("old") is None
+    assert runs.claim("new").status == RunStatus.QUEUED
+    runs.get("new").created_at = now - 100
+    assert runs.active == 2
+
+
+def test_finished_runs_are_compacted_and_bounded():
+    runs = RunRegistry(history=2)
+    for run_id in ("a", "b", "c"):
+        record = runs.add(run_id, message=object())
+        assert runs.claim(run_id) is record
+        runs.start(record)
+        assert runs.running is record
+        runs.finish(record)
+        assert record.message is None and record.input is None and record.done
+    assert [r.run_id for r in runs.history()] == ["b", "c"]
+    assert runs.get("a") is None and len(runs) == 0
+
+
+async def _admit(controller, user, log, hold):
+    async with controller.slot(user):
+        log.append(user)
+        await hold.wait()
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_admission_round_robin_across_users():
+    controller = AdmissionController(max_concurrent=1)
+    log, hold = [], asyncio.Event()
+    tasks = []
+    for user in ("a", "a", "a", "b", "c"):
+        tasks.append(asyncio.create_task(_admit(controller, user, log, hold)))
+        await _settle()
+    assert log == ["a"] and controller.waiting == 4
+    for _ in range(4):
+        hold.set()
+        hold.clear()
+        await _settle()
+    hold.set()
+    await asyncio.gather(*tasks)
+    assert log == ["a", "a", "b", "c", "a"]
+    assert controller.stats() == {"running": 0, "waiting": 0, "users": 0}
+
+
+async def test_admission_per_user_limit_and_positions():
+    controller = AdmissionController(max_per_user=1)
+    log, hold = [], asyncio.Event()
+    positions = []
+
+    async def waiting_run():
+        async def on_wait(position):
+            positions.append(position)
+        async with controller.slot("a", on_wait):
+            log.append("a2")
+
+    first = asyncio.create_task(_admit(controller, "a", log, hold))
+    await _settle()
+    second = asyncio.create_task(waiting_run())
+    other = asyncio.create_task(_admit(controller, "b", log, hold))
+    await _settle()
+    assert log == ["a", "b"] and positions == [1]
+    hold.set()
+    await asyncio.gather(first, second, other)
+    assert log == ["a", "b", "a2"]
+
+
+async def test_cancelled_waiter_leaves_queue():
+    controller = AdmissionController(max_concurrent=1)
+    log, hold = [], asyncio.Event()
+    first = asyncio.create_task(_admit(controller, "a", log, hold))
+    await _settle()
+    waiter = asyncio.create_task(_admit(controller, "b", log, hold))
+    await _settle()
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert controller.waiting == 0
+    hold.set()
+    await first
+    assert log == ["a"] and controller.running == 0
+
+
+class _GatedModel:
+    """Streams "partial " then the last user prompt's reply once `gate` is set."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.prompts = []
+
+    async def stream(self, messages, info):
+        prompts = [part.content for m in messages for part in m.parts
+                   if part.part_kind == 'user-prompt']
+        self.prompts.append(prompts)
+        yield "partial "
+        await self.gate.wait()
+        yield f"reply to {prompts[-1]}"
+
+
+def _thread(**options):
+    model = _GatedModel()
+    app, _ = fast_app(exts='ws', secret_key="test")
+    agui = setup_agui(app, Agent(FunctionModel(stream_function=model.stream)),
+                      server_side_runs=True, flush_interval_ms=0, **options)
+    return agui.thread("main"), model
+
+
+async def _until(predicate):
+    for _ in range(100):
+        if predicate():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("timed out")
+
+
+def _transcript(thread):
+    return [(m.role, m.content) for m in thread._messages]
+
+
+async def test_cancel_mid_stream_keeps_the_partial_reply():
+    thread, model = _thread()
+    stream = thread.open_event_stream()
+    run_id = await thread._handle_message("hi", {})
+    await _until(lambda: thread._streaming is not None and thread._streaming.content)
+    assert thread._runs.running.run_id == run_id
+    assert await thread.cancel_run()
+    await asyncio.gather(*thread._tasks)
+    assert _transcript(thread) == [("user", "hi"), ("assistant", "partial ")]
+    assert thread._runs.get(run_id).status == RunStatus.CANCELLED
+    assert thread._active is None and not await thread.cancel_run()
+    events = []
+    while not stream._queue.empty():
+        events.append(stream._queue.get_nowait())
+    assert events[-1].type == EventType.RUN_ERROR and events[-1].code == "cancelled"
+    assert EventType.RUN_FINISHED not in [e.type for e in events]
+
+
+async def test_queued_runs_stream_in_order_and_excess_is_rejected():
+    thread, model = _thread(max_queued_runs=1)
+    first = await thread._handle_message("one", {})
+    second = await thread._handle_message("two", {})
+    await _until(lambda: thread._runs.running is not None)
+    assert thread._runs.running.run_id == first
+    assert thread._runs.get(second).status == RunStatus.QUEUED
+    # The second run waits on the first: its message isn't in the transcript yet
+    assert _transcript(thread) == [("user", "one")]
+    assert await thread._handle_message("three", {}) is None
+    assert thread._runs.active == 2
+
+    model.gate.set()
+    await asyncio.gather(*thread._tasks)
+    assert _transcript(thread) == [
+        ("user", "one"), ("assistant", "partial reply to one"),
+        ("user", "two"), ("assistant", "partial reply to two"),
+    ]
+    # The queued run was built from the thread after the first reply was stored
+    assert model.prompts == [["one"], ["one", "two"]]
+    assert [r.status for r in thread._runs.history()] == [RunStatus.FINISHED] * 2
+    assert await thread._handle_message("four", {}) is not None
+
+
+async def test_cancelling_a_queued_run_drops_it_before_it_starts():
+    thread, model = _thread()
+    first = await thread._handle_message("one", {})
+    second = await thread._handle_message("two", {})
+    await _settle()
+    assert await thread.cancel_run(second)
+    model.gate.set()
+    await asyncio.gather(*thread._tasks)
+    assert _transcript(thread) == [("user", "one"), ("assistant", "partial reply to one")]
+    assert thread._runs.get(first).status == RunStatus.FINISHED
+    assert thread._runs.get(second).status == RunStatus.CANCELLED
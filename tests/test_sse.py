@@ -0,0 +1,105 @@
+import asyncio
+
+from fasthtml.common import Div, fast_app
+from pydantic_ai import Agent
+from pydantic_ai.models.test import TestModel
+
+from py_agui import setup_agui
+
+
+def _setup():
+    app, _ = fast_app(exts='ws', secret_key="test")
+    return app, setup_agui(app, Agent(TestModel()), transport='sse')
+
+
+def _events(body: bytes):
+    """(id, data) of each event in an SSE body, skipping comment lines."""
+    events = []
+    for block in body.decode().split("\n\n"):
+        lines = [line for line in block.split("\n") if line and not line.startswith(":")]
+        if lines:
+            fields = [line.partition(": ") for line in lines]
+            events.append((next((v for k, _, v in fields if k == "id"), None),
+                           "\n".join(v for k, _, v in fields if k == "data")))
+    return events
+
+
+async def _until(predicate):
+    for _ in range(100):
+        if predicate():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("timed out")
+
+
+def _ends_with(text: str):
+    return lambda body: text.encode() in body
+
+
+async def test_frames_are_streamed_with_their_cursors(request_app):
+    app, agui = _setup()
+    stream = asyncio.create_task(
+        request_app(app, 'GET', '/agui/sse/main', stop=_ends_with("third")))
+    await _until(lambda: len(agui.connections) == 1)
+    thread = agui.thread("main")
+    for text in ("first", "second", "third"):
+        await thread.send(Div(text))
+    status, headers, body = await stream
+
+    assert status == 200 and headers["content-type"].startswith("text/event-stream")
+    assert headers["cache-control"] == "no-cache"
+    events = _events(body)
+    assert len(events) == 3
+    assert all(text in data for (_, data), text in zip(events, ("first", "second", "third"),
+                                                        strict=True))
+    cursors = [cursor for cursor, _ in events]
+    assert cursors == [thread._replay.cursor_at(i) for i in range(1, 4)]
+    # The first frame carries the cursor marker for the chat script
+    assert f'data-seq="{cursors[0]}"' in events[0][1]
+    # Disconnecting unregisters the connection from the setup and the thread
+    assert len(agui.connections) == 0 and not thread._connections
+
+
+async def test_resume_replays_only_missed_frames(request_app):
+    app, agui = _setup()
+    thread = agui.thread("main")
+    stream = asyncio.create_task(
+        request_app(app, 'GET', '/agui/sse/main', stop=_ends_with("first")))
+    await _until(lambda: len(agui.connections) == 1)
+    await thread.send(Div("first"))
+    (cursor, _), = _events((await stream)[2])
+
+    # Sent while the client was away; the thread stays in memory and keeps buffering
+    keep = asyncio.create_task(
+        request_app(app, 'GET', '/agui/sse/main', stop=_ends_with("goodbye")))
+    await _until(lambda: len(agui.connections) == 1)
+    await thread.send(Div("second"))
+    await thread.send(Div("third"))
+
+    for resume in ({'path': f'/agui/sse/main?resume={cursor}'},
+                   {'path': '/agui/sse/main', 'headers': {'Last-Event-ID': cursor}}):
+        _, _, body = await request_app(app, 'GET', stop=_ends_with("third"), **resume)
+        events = _events(body)
+        assert len(events) == 2
+        assert "second" in events[0][1] and "third" in events[1][1]
+
+    # A cursor that is no longer buffered gets a snapshot of the chat instead
+    _, _, body = await request_app(app, 'GET', '/agui/sse/main?resume=unknown:1',
+                                   stop=_ends_with("chat-messages"))
+    (_, snapshot), = _events(body)
+    assert 'id="chat-messages"' in snapshot and 'hx-swap-oob="outerHTML"' in snapshot
+    await thread.send(Div("goodbye"))
+    await keep
+
+
+async def test_stream_ends_when_the_server_closes_the_connection(request_app):
+    app, agui = _setup()
+    stream = asyncio.create_task(request_app(app, 'GET', '/agui/sse/main'))
+    await _until(lambda: len(agui.connections) == 1)
+    thread = agui.thread("main")
+    (writer,) = thread._connections.values()
+    # What the 'disconnect' overflow policy does to a client that fell behind
+    writer.stop(close=True)
+    status, _, body = await stream
+    assert status == 200 and body == b""
+    assert len(agui.connections) == 0 and not thread._connections
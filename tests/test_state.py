@@ -0,0 +1,133 @@
+from typing import List
+
+import pytest
+from fasthtml.common import Div, to_xml
+from pydantic import BaseModel
+
+from py_agui.state import JsonPatchError, KeyedState, apply_patch, diff, keyed, state_key
+
+
+def test_apply_patch_operations():
+    doc = {"a": 1, "items": [1, 2], "nested": {"x": "y"}}
+    patched = apply_patch(doc, [
+        {"op": "add", "path": "/items/-", "value": 3},
+        {"op": "replace", "path": "/a", "value": 2},
+        {"op": "remove", "path": "/items/0"},
+        {"op": "move", "from": "/nested/x", "path": "/moved"},
+        {"op": "copy", "from": "/a", "path": "/copied"},
+        {"op": "test", "path": "/copied", "value": 2},
+    ])
+    assert patched == {"a": 2, "items": [2, 3], "nested": {}, "moved": "y", "copied": 2}
+    assert doc == {"a": 1, "items": [1, 2], "nested": {"x": "y"}}
+
+
+def test_apply_patch_escaped_pointer_and_root():
+    assert apply_patch({"a/b": {"c~d": 1}}, [{"op": "replace", "path": "/a~1b/c~0d", "value": 2}]) \
+        == {"a/b": {"c~d": 2}}
+    assert apply_patch({"a": 1}, [{"op": "replace", "path": "", "value": [1]}]) == [1]
+
+
+def test_apply_patch_in_place():
+    doc = {"items": []}
+    assert apply_patch(doc, [{"op": "add", "path": "/items/0", "value": 1}], in_place=True) is doc
+    assert doc == {"items": [1]}
+
+
+@pytest.mark.parametrize("op", [
+    {"op": "remove", "path": "/missing"},
+    {"op": "add", "path": "/items/5", "value": 1},
+    {"op": "add", "path": "/items/01", "value": 1},
+    {"op": "replace", "path": "items", "value": 1},
+    {"op": "test", "path": "/items/0", "value": 2},
+    {"op": "move", "from": "/obj", "path": "/obj/child"},
+    {"op": "remove", "path": ""},
+    {"op": "frobnicate", "path": "/items"},
+    {"path": "/items"},
+])
+def test_apply_patch_errors(op):
+    doc = {"items": [1], "obj": {}}
+    with pytest.raises(JsonPatchError):
+        apply_patch(doc, [op])
+    assert doc == {"items": [1], "obj": {}}
+
+
+@pytest.mark.parametrize("old,new", [
+    ({"a": 1, "b": [1, 2, 3]}, {"a": 1, "b": [1, 5]}),
+    ({"a": {"b": 1}}, {"a": {"c": 2}, "d": None}),
+    ({"todos": [{"done": False}]}, {"todos": [{"done": True}, {"done": False}]}),
+    ([1, 2], {"a": 1}),
+    ({"a": 1}, {"a": 1}),
+])
+def test_diff_round_trips(old, new):
+    assert apply_patch(old, diff(old, new)) == new
+
+
+def test_diff_is_index_stable():
+    assert diff({"items": [1, 2, 3]}, {"items": [1, 4]}) == [
+        {"op": "replace", "path": "/items/1", "value": 4},
+        {"op": "remove", "path": "/items/2"},
+    ]
+    assert diff({"items": [1]}, {"items": [1, 2]}) == [
+        {"op": "add", "path": "/items/1", "value": 2}]
+
+
+class Todo(BaseModel):
+    title: str
+    done: bool = False
+
+    def __ft__(self):
+        return Div(self.title, cls="done" if self.done else "")
+
+
+class TodoState(BaseModel):
+    title: str = "Todos"
+    todos: List[Todo] = []
+
+    def __ft__(self):
+        return Div(Div(self.title), *[keyed(t, f"/todos/{i}") for i, t in enumerate(self.todos)],
+                   id="agui-state", hx_swap_oob="innerHTML")
+
+
+def _patched(keyed_state: KeyedState, old: TodoState, new: TodoState):
+    return keyed_state.render_patch(new, diff(old.model_dump(), new.model_dump()))
+
+
+def test_render_patch_rerenders_changed_item():
+    old = TodoState(todos=[Todo(title="a"), Todo(title="b")])
+    ks = KeyedState()
+    ks.render(old)
+    assert ks.keys == {("todos", "0"), ("todos", "1")}
+    new = old.model_copy(deep=True)
+    new.todos[1].done = True
+    elements = _patched(ks, old, new)
+    assert len(elements) == 1
+    html = to_xml(elements[0])
+    assert f'id="{state_key("/todos/1")}"' in html
+    assert 'hx-swap-oob="outerHTML"' in html and 'class="done"' in html
+
+
+def test_render_patch_appends_and_removes():
+    old = TodoState(todos=[Todo(title="a"), Todo(title="b")])
+    ks = KeyedState()
+    ks.render(old)
+
+    appended = TodoState(todos=[*old.todos, Todo(title="c"), Todo(title="d")])
+    elements = _patched(ks, old, appended)
+    assert len(elements) == 1
+    html = to_xml(elements[0])
+    assert f'id="{state_key("/todos/1")}"' in html and 'hx-swap-oob="afterend"' in html
+    assert html.index(state_key("/todos/2")) < html.index(state_key("/todos/3"))
+    assert ("todos", "3") in ks.keys
+
+    popped = TodoState(todos=appended.todos[:3])
+    elements = _patched(ks, appended, popped)
+    assert [to_xml(e) for e in elements] == [
+        to_xml(Div(id=state_key("/todos/3"), hx_swap_oob="delete"))]
+    assert ("todos", "3") not in ks.keys
+
+
+def test_render_patch_falls_back_outside_keyed_elements():
+    old = TodoState(todos=[Todo(title="a")])
+    ks = KeyedState()
+    ks.render(old)
+    assert _patched(ks, old, old.model_copy(update={"title": "Renamed"})) is None
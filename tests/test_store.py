@@ -0,0 +1,62 @@
+import pytest
+from ag_ui.core.types import AssistantMessage, UserMessage
+from pydantic import BaseModel
+
+from py_agui.store import InMemoryThreadStore, SQLiteThreadStore
+
+
+class Counter(BaseModel):
+    count: int = 0
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = (InMemoryThreadStore() if request.param == "memory"
+             else SQLiteThreadStore(str(tmp_path / "agui.db")))
+    yield store
+    store.close()
+
+
+def _fill(store):
+    store.append_message("t1", UserMessage(id="u1", role="user", content="hi"))
+    store.append_message("t1", AssistantMessage(id="a1", role="assistant", content="**hello**"))
+    store.save_state("t1", Counter(count=1))
+    store.save_state("t1", Counter(count=2))
+    store.append_thinking_step("t1", {"type": "thinking", "text": "hmm"})
+    store.save_rendered("t1", "a1", "digest", "<p><strong>hello</strong></p>")
+    store.save_summary("t1", "greetings", 2)
+    store.append_message("t2", UserMessage(id="u2", role="user", content="other"))
+
+
+def test_round_trip(store):
+    assert store.load("t1") is None
+    _fill(store)
+    record = store.load("t1")
+    assert [(m.id, m.role, m.content) for m in record.messages] == [
+        ("u1", "user", "hi"), ("a1", "assistant", "**hello**")]
+    assert Counter.model_validate(record.state).count == 2
+    assert record.thinking_steps == [{"type": "thinking", "text": "hmm"}]
+    assert record.rendered == {"a1": ("digest", "<p><strong>hello</strong></p>")}
+    assert tuple(record.summary) == ("greetings", 2)
+    assert [m.id for m in store.load("t2").messages] == ["u2"]
+
+
+def test_delete(store):
+    _fill(store)
+    store.delete("t1")
+    assert store.load("t1") is None
+    assert store.load("t2") is not None
+
+
+def test_sqlite_survives_reopen(tmp_path):
+    path = str(tmp_path / "agui.db")
+    store = SQLiteThreadStore(path)
+    _fill(store)
+    store.close()
+    reopened = SQLiteThreadStore(path)
+    record = reopened.load("t1")
+    reopened.close()
+    assert [m.id for m in record.messages] == ["u1", "a1"]
+    assert record.state == {"count": 2}
+    assert record.summary == ("greetings", 2)
+    assert record.rendered["a1"][1] == "<p><strong>hello</strong></p>"
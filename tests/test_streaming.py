@@ -0,0 +1,199 @@
+import asyncio
+
+import pytest
+from ag_ui.core.events import (
+    EventType,
+    TextMessageContentEvent,
+    TextMessageEndEvent,
+    ToolCallStartEvent,
+)
+
+from py_agui.streaming import ConnectionWriter, DeltaCoalescer, Payload, ReplayBuffer
+
+
+def _delta(text: str, message_id: str = "m1") -> TextMessageContentEvent:
+    return TextMessageContentEvent(type=EventType.TEXT_MESSAGE_CONTENT, message_id=message_id,
+                                   delta=text)
+
+
+def _coalescer(**kw):
+    emitted = []
+
+    async def emit(event):
+        emitted.append(event)
+    return DeltaCoalescer(emit, **kw), emitted
+
+
+def _summary(events):
+    return [(e.type, getattr(e, "delta", None)) for e in events]
+
+
+async def test_coalescer_flushes_at_byte_threshold():
+    coalescer, emitted = _coalescer(flush_interval_ms=10_000, max_bytes=10)
+    for text in ("hello", "wor", "ld!", "x"):
+        await coalescer.push(_delta(text))
+    assert [e.delta for e in emitted] == ["helloworld!"]
+    await coalescer.flush()
+    assert [e.delta for e in emitted] == ["helloworld!", "x"]
+
+
+async def test_coalescer_flushes_after_interval():
+    coalescer, emitted = _coalescer(flush_interval_ms=10)
+    await coalescer.push(_delta("a"))
+    await coalescer.push(_delta("b"))
+    assert emitted == []
+    await asyncio.sleep(0.05)
+    assert [e.delta for e in emitted] == ["ab"]
+    await coalescer.flush()
+    assert len(emitted) == 1
+
+
+async def test_coalescer_flushes_at_event_boundaries_in_order():
+    coalescer, emitted = _coalescer(flush_interval_ms=10_000)
+    await coalescer.push(_delta("a"))
+    await coalescer.push(_delta("b"))
+    await coalescer.push(_delta("c", message_id="m2"))
+    await coalescer.push(ToolCallStartEvent(type=EventType.TOOL_CALL_START, tool_call_id="t1",
+                                            tool_call_name="search"))
+    await coalescer.push(_delta("d", message_id="m2"))
+    await coalescer.push(TextMessageEndEvent(type=EventType.TEXT_MESSAGE_END, message_id="m2"))
+    assert _summary(emitted) == [
+        (EventType.TEXT_MESSAGE_CONTENT, "ab"),
+        (EventType.TEXT_MESSAGE_CONTENT, "c"),
+        (EventType.TOOL_CALL_START, None),
+        (EventType.TEXT_MESSAGE_CONTENT, "d"),
+        (EventType.TEXT_MESSAGE_END, None),
+    ]
+    assert emitted[1].message_id == "m2"
+
+
+async def test_coalescer_disabled_emits_every_delta():
+    coalescer, emitted = _coalescer(flush_interval_ms=0)
+    await coalescer.push(_delta("a"))
+    await coalescer.push(_delta("b"))
+    assert [e.delta for e in emitted] == ["a", "b"]
+
+
+async def test_coalescer_raises_interval_flush_errors_to_the_run():
+    async def emit(event):
+        raise RuntimeError("socket gone")
+    coalescer = DeltaCoalescer(emit, flush_interval_ms=5)
+    await coalescer.push(_delta("a"))
+    await asyncio.sleep(0.03)
+    with pytest.raises(RuntimeError, match="socket gone"):
+        await coalescer.push(_delta("b"))
+
+
+class _SlowSocket:
+    """A client that accepts nothing until `gate` is set."""
+
+    def __init__(self):
+        self.sent = []
+        self.gate = asyncio.Event()
+        self.closed = False
+
+    async def send(self, item):
+        await self.gate.wait()
+        self.sent.append(str(item))
+
+    async def close(self):
+        self.closed = True
+
+
+async def _fill(policy: str, frames: int = 6):
+    """Queue `frames` frames on a writer whose first send blocks, with room for three."""
+    socket = _SlowSocket()
+    writer = ConnectionWriter(socket.send, socket.close, max_queue=3, policy=policy)
+    accepted = [writer.put(Payload("<p>0</p>"))]
+    await asyncio.sleep(0)  # the writer task takes frame 0 and blocks on it
+    accepted += [writer.put(Payload(f"<p>{i}</p>")) for i in range(1, frames)]
+    assert writer.max_depth <= 3
+    return socket, writer, accepted
+
+
+async def _drain(socket, writer):
+    socket.gate.set()
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert writer.depth == 0
+
+
+async def test_writer_drop_oldest_keeps_the_newest_frames():
+    socket, writer, accepted = await _fill('drop-oldest')
+    assert all(accepted) and writer.depth == 3
+    await _drain(socket, writer)
+    assert socket.sent == ["<p>0</p>", "<p>3</p>", "<p>4</p>", "<p>5</p>"]
+    assert writer.stats() == {'depth': 0, 'max_depth': 3, 'sent': 4, 'dropped': 2,
+                              'coalesced': 0}
+
+
+async def test_writer_coalesce_merges_the_queue_into_one_frame():
+    socket, writer, accepted = await _fill('coalesce')
+    assert all(accepted) and writer.depth == 3
+    await _drain(socket, writer)
+    assert socket.sent == ["<p>0</p>", "<p>1</p><p>2</p><p>3</p>", "<p>4</p>", "<p>5</p>"]
+    assert writer.coalesced == 2 and writer.dropped == 0
+
+
+async def test_writer_disconnect_closes_a_slow_connection():
+    socket, writer, accepted = await _fill('disconnect', frames=5)
+    assert accepted == [True, True, True, True, False]
+    await asyncio.sleep(0)
+    assert writer.closed and socket.closed and writer.depth == 0
+    assert writer.put(Payload("<p>late</p>")) is False
+    socket.gate.set()
+    await asyncio.sleep(0)
+    assert socket.sent == []
+
+
+async def test_writer_stops_after_a_failed_send():
+    async def send(item):
+        raise ConnectionError
+    writer = ConnectionWriter(send)
+    assert writer.put(Payload("<p>0</p>"))
+    await asyncio.sleep(0)
+    assert writer.closed and writer.put(Payload("<p>1</p>")) is False
+
+
+def _buffer(maxlen: int, frames: int) -> ReplayBuffer:
+    buffer = ReplayBuffer(maxlen)
+    for i in range(frames):
+        buffer.append(Payload(f"<div>{i}</div>"))
+    return buffer
+
+
+def test_since_returns_frames_after_cursor():
+    buffer = _buffer(8, 5)
+    assert buffer.since(buffer.cursor_at(2)) == ["<div>2</div>", "<div>3</div>", "<div>4</div>"]
+    assert buffer.since(buffer.cursor_at(0)) == [f"<div>{i}</div>" for i in range(5)]
+    assert buffer.since(buffer.cursor) == []
+
+
+def test_since_rejects_unknown_cursors():
+    buffer = _buffer(8, 3)
+    assert buffer.since("deadbeef:1") is None
+    assert buffer.since(f"{buffer.epoch}:4") is None
+    assert buffer.since(f"{buffer.epoch}:x") is None
+    assert buffer.since("garbage") is None
+    assert buffer.since(ReplayBuffer().cursor_at(1)) is None
+
+
+def test_since_after_frames_fell_out():
+    buffer = _buffer(3, 6)
+    assert len(buffer) == 3
+    assert buffer.since(buffer.cursor_at(2)) is None
+    assert buffer.since(buffer.cursor_at(3)) == ["<div>3</div>", "<div>4</div>", "<div>5</div>"]
+
+
+def test_clear_keeps_numbering_and_tracks_bytes():
+    buffer = ReplayBuffer(2)
+    assert buffer.append(Payload("abcd")) == 4
+    assert buffer.append(Payload("ef")) == 2
+    assert buffer.append(Payload("g")) == -3
+    assert buffer.nbytes == 3
+    cursor = buffer.cursor
+    assert buffer.clear() == 3
+    assert buffer.nbytes == 0 and len(buffer) == 0
+    assert buffer.since(cursor) == []
+    assert buffer.since(buffer.cursor_at(2)) is None
+    assert buffer.next_cursor() == buffer.cursor_at(4)
@@ -0,0 +1,94 @@
+from typing import List
+
+from ag_ui.core.types import UserMessage
+from fasthtml.common import fast_app
+from pydantic import BaseModel
+from pydantic_ai import Agent
+from pydantic_ai.models.test import TestModel
+
+from py_agui import InMemoryThreadStore, SQLiteThreadStore, setup_agui
+
+
+class Todos(BaseModel):
+    items: List[str] = []
+
+
+def _setup(**kw):
+    app, _ = fast_app(exts='ws', secret_key="test")
+    return setup_agui(app, Agent(TestModel()), **kw)
+
+
+def test_threads_share_the_template_until_they_edit_it():
+    template = Todos(items=["shared"])
+    agui = _setup(initial_state=template)
+    first, second = agui.thread("first"), agui.thread("second")
+    assert first._state is second._state
+
+    first.state.items.append("mine")
+    assert first._state is not second._state
+    assert second.state.items == ["shared"]
+    assert agui._state.items == ["shared"] and template.items == ["shared"]
+    # A thread created later still starts from the untouched template
+    assert agui.thread("third").state.items == ["shared"]
+
+
+def test_dict_state_is_copied_per_thread():
+    agui = _setup(initial_state={"items": []})
+    agui.thread("first").state["items"].append(1)
+    assert agui.thread("second").state == {"items": []}
+    assert agui.thread("first").state == {"items": [1]}
+
+
+def test_save_state_persists_in_place_edits():
+    store = InMemoryThreadStore()
+    agui = _setup(initial_state=Todos(), store=store)
+    thread = agui.thread("main")
+    thread.state.items.append("a")
+    assert store.load("main") is None
+    thread.save_state()
+    assert store.load("main").state == Todos(items=["a"])
+
+    # Nothing to save until the state is handed out for editing again
+    store.save_state("main", Todos(items=["elsewhere"]))
+    thread.save_state()
+    assert store.load("main").state == Todos(items=["elsewhere"])
+    thread.state.items.append("b")
+    thread.save_state()
+    assert store.load("main").state == Todos(items=["a", "b"])
+
+
+def test_state_factory_builds_each_thread_state():
+    agui = _setup(state_factory=lambda thread_id: Todos(items=[thread_id]))
+    assert agui.thread("first").state.items == ["first"]
+    assert agui.thread("second").state.items == ["second"]
+
+
+def test_evicted_thread_reloads_from_the_store(tmp_path):
+    store = SQLiteThreadStore(str(tmp_path / "agui.db"))
+    agui = _setup(initial_state=Todos(), store=store, max_threads=1)
+    first = agui.thread("first")
+    first._add_message(UserMessage(id="u1", role="user", content="hello"))
+    first.state.items.append("unsaved")
+
+    agui.thread("second")
+    assert list(agui._threads) == ["second"]
+    assert agui._thread_bytes == agui._threads["second"]._approx_bytes
+
+    reloaded = agui.thread("first")
+    assert reloaded is not first and list(agui._threads) == ["first"]
+    assert [(m.id, m.content) for m in reloaded._messages] == [("u1", "hello")]
+    assert reloaded.state == Todos(items=["unsaved"])
+    assert reloaded._approx_bytes == first._approx_bytes
+    store.close()
+
+
+def test_threads_in_use_are_not_evicted(tmp_path):
+    store = SQLiteThreadStore(str(tmp_path / "agui.db"))
+    agui = _setup(store=store, max_threads=1)
+    agui.thread("first").subscribe("tab", send=None)
+    agui.thread("second")
+    assert list(agui._threads) == ["first", "second"]
+    agui.thread("first").unsubscribe("tab")
+    agui.thread("third")
+    assert list(agui._threads) == ["third"]
+    store.close()